@@ -0,0 +1,95 @@
+import math
+import os
+import numpy
+import DateCodec
+import PerformanceStore
+
+# returns index of rows with dates and times of each scenario and machine sorted by date
+# index[scenario][machine] is [dates, times, positions] where dates are ordinals and positions are the row numbers
+def buildIndex(rows):
+    lists = {}
+    for position, row in enumerate(rows):
+        if row[0] not in lists:
+            lists[row[0]] = {}
+        if row[5] not in lists[row[0]]:
+            lists[row[0]][row[5]] = [[], [], []]
+        lists[row[0]][row[5]][0].append(row[3])
+        lists[row[0]][row[5]][1].append(row[2])
+        lists[row[0]][row[5]][2].append(position)
+
+    index = {}
+    for scenario in lists:
+        index[scenario] = {}
+        for machine, (dates, times, positions) in lists[scenario].items():
+            dates = numpy.array(dates, dtype=numpy.int64)
+            order = numpy.argsort(dates, kind="stable")
+            index[scenario][machine] = [dates[order], numpy.array(times, dtype=numpy.float64)[order], numpy.array(positions, dtype=numpy.int64)[order]]
+    return index
+
+# returns times of a scenario on the specified machines with dates from start to end, including both
+# times are ordered newest first and then by row, the same order the rows were read in after sorting by date
+def windowTimes(index, scenario, machines, start, end):
+    dates = []
+    times = []
+    positions = []
+    for machine in machines:
+        if scenario in index and machine in index[scenario]:
+            machineDates, machineTimes, machinePositions = index[scenario][machine]
+            first = numpy.searchsorted(machineDates, start, side="left")
+            last = numpy.searchsorted(machineDates, end, side="right")
+            dates.append(machineDates[first:last])
+            times.append(machineTimes[first:last])
+            positions.append(machinePositions[first:last])
+    if len(times) == 0:
+        return numpy.empty(0)
+    order = numpy.lexsort((numpy.concatenate(positions), -numpy.concatenate(dates)))
+    return numpy.concatenate(times)[order]
+
+# returns dictionary of count, average, standard deviation, median and percentiles of an array of times
+def timeStats(times, percentiles=(10, 90)):
+    stats = {"count": len(times)}
+    if len(times) == 0:
+        return stats
+    # times are added in order so results match adding them up one at a time
+    stats["average"] = sum(times.tolist()) / len(times)
+    stats["standardDeviation"] = math.sqrt(sum(((times - stats["average"]) ** 2).tolist()) / len(times))
+    stats["median"] = float(numpy.median(times))
+    for percentile in percentiles:
+        stats["p" + str(percentile)] = float(numpy.percentile(times, percentile))
+    return stats
+
+# returns dictionary of stats of each scenario on the specified machines within the last reportRange days
+def windowStats(index, scenarios, machines, reportRange):
+    start = DateCodec.windowStart(reportRange)
+    end = DateCodec.today()
+    stats = {}
+    for scenario in scenarios:
+        stats[scenario] = timeStats(windowTimes(index, scenario, machines, start, end))
+    return stats
+
+# returns dictionaries of baselines and average times for all scenarios
+# baselines are the official baselines established in the test
+# historical baselines are calculated by adding the standard deviation and 110% of the average data for each scenario
+# average times and historical baselines are calculated only using data from the last reportRange days
+# index can be passed in if it has already been built from rows covering the window
+def getBaselines(reportRange, path, machines, index=None):
+    baselines = {}
+    historicalBaselines = {}
+    averages = {}
+
+    # retrieve test baselines
+    with open(os.path.join(path, "Baseline Data.csv"), 'r') as f:
+        for line in f.read().splitlines()[1:]:
+            lineData = line.rsplit(',', 2)
+            baselines[lineData[0]] = float(lineData[2])
+
+    # calculate historical baselines
+    if index is None:
+        index = buildIndex(PerformanceStore.readRows(path, machines=machines, start=DateCodec.windowStart(reportRange)))
+    stats = windowStats(index, baselines.keys(), machines, reportRange)
+    for scenario in baselines.keys():
+        if stats[scenario]["count"] > 0:
+            averages[scenario] = stats[scenario]["average"]
+            historicalBaselines[scenario] = averages[scenario]*1.1 + stats[scenario]["standardDeviation"]
+
+    return baselines, historicalBaselines, averages
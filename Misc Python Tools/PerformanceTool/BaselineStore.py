@@ -0,0 +1,77 @@
+import csv
+import json
+import os
+from datetime import datetime
+import DateCodec
+import SafeFile
+
+# name of the file that stores the baseline of each scenario, saved next to the _performance.csv files
+storeFileName = "Baselines.json"
+
+# name of the file that every change to a baseline is appended to
+historyFileName = "Baseline History.csv"
+
+# loads the baseline of each scenario of each test as {test: {scenario: [time, effective date, machine]}}
+def loadBaselines(path):
+    storePath = os.path.join(path, storeFileName)
+    if not os.path.exists(storePath):
+        return {}
+    with open(storePath, 'r') as f:
+        return json.load(f)
+
+# saves baselines for the next run
+def saveBaselines(path, baselines):
+    SafeFile.saveJson(os.path.join(path, storeFileName), baselines, indent=1)
+
+# sets the baseline of a scenario of a test if the scenario is new or date is newer than the baseline's effective date
+# a newer line with the same baseline moves the date forward so older lines from the next run cannot replace it
+# newest is set for the newest line of the scenario in lines appended to a log, which comes after every line already read
+# from that log, so it also replaces a baseline from the same date and machine
+def update(entries, scenario, baseTime, date, machine, newest=False):
+    entry = entries.get(scenario)
+    if entry is None or DateCodec.toOrdinal(entry[1]) < DateCodec.toOrdinal(date) or (newest and entry[2] == machine and entry[1] == date):
+        entries[scenario] = [baseTime, date, machine]
+
+# returns dictionary of the time of every baseline by (test, scenario), to find what a run changed
+def snapshot(baselines):
+    times = {}
+    for test in baselines:
+        for scenario, entry in baselines[test].items():
+            times[(test, scenario)] = entry[0]
+    return times
+
+# returns [test, scenario, old time, new time, effective date, machine] of each baseline that differs from previous
+# a baseline that is new has no old time and one that was removed has no new time, effective date or machine
+def changes(previous, baselines):
+    changed = []
+    for test in baselines:
+        for scenario, (baseTime, baseDate, machine) in baselines[test].items():
+            oldTime = previous.get((test, scenario), "")
+            if oldTime != baseTime:
+                changed.append([test, scenario, oldTime, baseTime, baseDate, machine])
+    current = snapshot(baselines)
+    for (test, scenario), oldTime in previous.items():
+        if (test, scenario) not in current:
+            changed.append([test, scenario, oldTime, "", "", ""])
+    return changed
+
+# appends changes to the history file with the date they were found, so the drift of each baseline can be followed
+def appendHistory(path, changed):
+    if len(changed) == 0:
+        return
+    historyPath = os.path.join(path, historyFileName)
+    with open(historyPath, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(["Date Changed", "Test Name", "Scenario", "Old Time (s)", "New Time (s)", "Effective Date", "Machine"])
+        found = datetime.today().strftime("%m/%d/%Y")
+        for test, scenario, oldTime, baseTime, baseDate, machine in changed:
+            writer.writerow([found, test, scenario, oldTime, baseTime, baseDate, machine])
+
+# writes Baseline Data.csv with the time of every baseline
+def writeCsv(path, baselines):
+    with open(os.path.join(path, "Baseline Data.csv"), 'w') as f:
+        f.write("Scenario,Test Name,Time (s)\n")
+        for test in baselines:
+            for scenario, entry in baselines[test].items():
+                f.write(scenario + ',' + test + ',' + str(entry[0]) + '\n')
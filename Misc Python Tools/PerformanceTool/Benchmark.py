@@ -0,0 +1,207 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import BaselineStats
+import DateCodec
+import PerfQuery
+
+# times the PerformanceTool on a synthetic history of logs kept in local directories
+# usage: Benchmark.py --machines 6 --tests 30 --scenarios 8 --days 365 --output "Benchmark Results.json"
+toolPath = os.path.dirname(os.path.abspath(__file__))
+
+# returns the H:MM:SS text of a duration in seconds, with milliseconds if decimals is set
+def durationText(seconds, decimals=False):
+    minutes, sec = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if decimals:
+        return "{}:{:02d}:{:06.3f}".format(hours, minutes, sec)
+    return "{}:{:02d}:{:02d}".format(hours, minutes, int(sec))
+
+# appends days of history ending on lastDay to logs in root\MACHINE\PerformanceLogging
+# returns the path of Machines.txt, the machine names and the test names
+# every machine runs every test once a day, scenarios of the last test get slower over the last week so the report has pages to draw
+# baselines only depend on seed, so history can be added a few days at a time
+def writeLogs(root, machineCount, testCount, scenarioCount, days, lastDay, seed):
+    machines = ["BENCH{:02d}".format(number) for number in range(machineCount)]
+    tests = ["Perf_Bench{:02d}".format(number) for number in range(testCount)]
+    baselines = {}
+    generator = random.Random(seed)
+    for test in tests:
+        for number in range(scenarioCount):
+            baselines[(test, number)] = generator.uniform(5, 300)
+    generator = random.Random(seed * 1000000 + lastDay)
+
+    for machine in machines:
+        logPath = os.path.join(root, machine, "PerformanceLogging")
+        os.makedirs(logPath, exist_ok=True)
+        for test in tests:
+            with open(os.path.join(logPath, test + ".log"), 'a') as f:
+                for day in range(lastDay - days + 1, lastDay + 1):
+                    runTime = datetime.fromordinal(day).replace(hour=generator.randrange(24), minute=generator.randrange(60))
+                    for number in range(scenarioCount):
+                        baseline = baselines[(test, number)]
+                        measured = baseline * generator.uniform(0.8, 1.05)
+                        if test == tests[-1] and lastDay - day < 7:
+                            measured *= 1.5
+                        f.write(runTime.strftime("%m/%d/%Y %I:%M:%S %p") + ", " + test + " Scenario " + str(number) + ", "
+                            + durationText(baseline) + ", " + durationText(measured, True) + "\n")
+
+    machinesPath = os.path.join(root, "Machines.txt")
+    with open(machinesPath, 'w') as f:
+        f.write("Add filepaths for all machines used for testing below\n")
+        for machine in machines:
+            f.write(os.path.join(root, machine, "PerformanceLogging") + "\n")
+    return machinesPath, machines, tests
+
+# runs one of the tool's scripts and returns the number of seconds it took and the seconds of each stage it printed
+def runScript(script, arguments):
+    begin = time.perf_counter()
+    output = subprocess.run([sys.executable, os.path.join(toolPath, script)] + arguments, check=True, stdout=subprocess.PIPE, cwd=toolPath, text=True).stdout
+    seconds = time.perf_counter() - begin
+    scriptStages = {}
+    for line in output.splitlines():
+        if line.startswith("[stage] "):
+            name, summary = line[len("[stage] "):].split(": ", 1)
+            scriptStages[name] = float(summary.split(" s")[0])
+    return seconds, scriptStages
+
+# returns the seconds a script spends importing modules before it parses its arguments and the top level modules it imports
+# with their seconds, measured with python -X importtime while the script prints its help
+def importTime(script):
+    output = subprocess.run([sys.executable, "-X", "importtime", os.path.join(toolPath, script), "--help"], check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=toolPath, text=True).stderr
+    modules = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        # modules imported by another module are indented below it
+        if fields[1].strip().isdigit() and not fields[2].startswith("  "):
+            modules[fields[2].strip()] = int(fields[1]) / 1000000
+    return sum(modules.values()), modules
+
+# checks that a script starts quickly, since importing plotting libraries at startup would slow down every report
+# returns the seconds, budget and slowest imports of the script and a list of the reasons the check failed
+def startupCheck(script, budget):
+    seconds, modules = importTime(script)
+    slowest = sorted(modules, key=modules.get, reverse=True)[:5]
+    startup = {"seconds": seconds, "budget": budget, "slowest": {module: modules[module] for module in slowest}}
+    failures = []
+    if seconds > budget:
+        failures.append("imports took {:.3f} s, more than the budget of {:.3f} s".format(seconds, budget))
+    for module in modules:
+        if module.split(".")[0] in ["matplotlib", "pypdf"]:
+            failures.append(module + " is imported at startup")
+    return startup, failures
+
+# prints the result of a startup check and exits with an error if it failed
+def reportStartup(script, startup, failures):
+    print("startup imports: {:.3f} s, slowest: {}".format(startup["seconds"], ", ".join(startup["slowest"])))
+    if len(failures) > 0:
+        for failure in failures:
+            print("Startup check failed: " + script + " " + failure)
+        raise SystemExit(1)
+
+# returns number of lines in a file
+def countLines(path):
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Time the PerformanceTool on synthetic logs")
+    parser.add_argument("--machines", type = int, default = 6, help = "Number of machines to generate logs for")
+    parser.add_argument("--tests", type = int, default = 30, help = "Number of tests on each machine")
+    parser.add_argument("--scenarios", type = int, default = 8, help = "Number of scenarios in each test")
+    parser.add_argument("--days", type = int, default = 365, help = "Days of history in each log")
+    parser.add_argument("--range", type = int, default = 60, help = "Number of days of data to include in baselines and the report")
+    parser.add_argument("--seed", type = int, default = 0, help = "Seed for generated times")
+    parser.add_argument("--work", default = '', help = "Empty directory to generate logs in, a temporary directory is used and removed if not set")
+    parser.add_argument("--output", default = "Benchmark Results.json", help = "JSON file to write timings to")
+    parser.add_argument("--no-report", action = "store_true", help = "Skip timing PerformanceReportTool.py")
+    parser.add_argument("--startup-budget", type = float, default = 0.5, help = "Most seconds PerformanceReportTool.py may spend importing modules before failing the benchmark")
+    parser.add_argument("--startup-only", action = "store_true", help = "Only check how long PerformanceReportTool.py spends importing modules, without generating logs")
+    args = parser.parse_args()
+    if args.startup_only:
+        reportStartup("PerformanceReportTool.py", *startupCheck("PerformanceReportTool.py", args.startup_budget))
+        raise SystemExit(0)
+    if args.work != '' and os.path.exists(args.work) and len(os.listdir(args.work)) > 0:
+        parser.error("--work must be an empty directory")
+
+    # the scripts run from the tool's directory, so the paths passed to them are made absolute
+    workPath = os.path.abspath(args.work) if args.work != '' else tempfile.mkdtemp()
+    logsPath = os.path.join(workPath, "Output")
+    os.makedirs(logsPath, exist_ok=True)
+    today = DateCodec.today()
+    results = {
+        "date": datetime.today().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"machines": args.machines, "tests": args.tests, "scenarios": args.scenarios, "days": args.days, "range": args.range, "seed": args.seed},
+        "stages": {},
+        "scriptStages": {}
+        }
+    stages = results["stages"]
+
+    try:
+        # generate the history, leaving out the last day to append before the incremental run
+        begin = time.perf_counter()
+        machinesPath, machines, tests = writeLogs(workPath, args.machines, args.tests, args.scenarios, args.days - 1, today - 1, args.seed)
+        stages["generate"] = time.perf_counter() - begin
+        ingestArguments = ["--logs", logsPath, "--machines", machinesPath, "--install", "1.0"]
+
+        # first run reads every log from the start
+        stages["ingest"], results["scriptStages"]["ingest"] = runScript("Performance.py", ingestArguments + ["--full"])
+
+        # a day later only the new lines are read
+        writeLogs(workPath, args.machines, args.tests, args.scenarios, 1, today, args.seed)
+        stages["ingestIncremental"], results["scriptStages"]["ingestIncremental"] = runScript("Performance.py", ingestArguments)
+        results["rows"] = countLines(os.path.join(logsPath, "Performance.csv")) - 1
+
+        begin = time.perf_counter()
+        BaselineStats.getBaselines(args.range, logsPath, machines)
+        stages["getBaselines"] = time.perf_counter() - begin
+
+        # the first refresh builds Performance.db and the query index, after that opening it only checks that nothing changed
+        begin = time.perf_counter()
+        store, columns = PerfQuery.refreshIndex(logsPath)
+        stages["queryIndex"] = time.perf_counter() - begin
+        store.close()
+        begin = time.perf_counter()
+        store, columns = PerfQuery.refreshIndex(logsPath)
+        stages["queryOpen"] = time.perf_counter() - begin
+        begin = time.perf_counter()
+        PerfQuery.query(store, columns, "*Scenario 1", machines=machines[:2], start=today - args.range, groupBy=["test", "machine"])
+        stages["query"] = time.perf_counter() - begin
+        begin = time.perf_counter()
+        PerfQuery.query(store, columns, groupBy=["machine"])
+        stages["queryAll"] = time.perf_counter() - begin
+        store.close()
+
+        if not args.no_report:
+            stages["report"], results["scriptStages"]["report"] = runScript("PerformanceReportTool.py", ["--logs", logsPath, "--save", workPath, "--range", str(args.range),
+                "--machines", ",".join(machines), "--tests", ",".join(tests), "--bug-command", "python GetBugsStub.py"])
+
+            # a report of a machine without results has nothing flagged, which should not need GetBugs
+            stages["reportNothingFlagged"], results["scriptStages"]["reportNothingFlagged"] = runScript("PerformanceReportTool.py", ["--logs", logsPath, "--save", workPath,
+                "--range", str(args.range), "--machines", "NOMACHINE", "--tests", ",".join(tests), "--bug-command", "python GetBugsStub.py"])
+    finally:
+        if args.work == '':
+            shutil.rmtree(workPath, ignore_errors=True)
+
+    # the report has to start quickly, so importing plotting libraries at startup fails the benchmark
+    results["startup"], startupFailures = startupCheck("PerformanceReportTool.py", args.startup_budget)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    for stage in stages:
+        print("{}: {:.3f} s".format(stage, stages[stage]))
+    print("Results saved to: " + os.path.abspath(args.output))
+    reportStartup("PerformanceReportTool.py", results["startup"], startupFailures)
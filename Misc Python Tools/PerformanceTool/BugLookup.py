@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import SafeFile
+
+# name of the file that stores GetBugs results, saved next to Performance.csv
+cacheFileName = "Bugs Cache.json"
+
+# runs GetBugs for one test and returns the lines of the Bugs.txt it writes
+# GetBugs is called as GetBugs.exe <test> <directory> <key> and writes Bugs.txt to that directory, which the tool used to
+# read back from the GetBugs folder it passed, so each call gets its own directory
+# raises OSError if GetBugs fails or does not write Bugs.txt there, so a lookup that did not happen is never read as no bugs
+def runGetBugs(command, test, key):
+    with tempfile.TemporaryDirectory() as outputPath:
+        code = subprocess.run(command + [test, outputPath, key]).returncode
+        bugsPath = os.path.join(outputPath, "Bugs.txt")
+        if code != 0:
+            raise OSError("exited with code " + str(code))
+        if not os.path.exists(bugsPath):
+            raise OSError("no Bugs.txt was written to " + outputPath)
+        with open(bugsPath, 'r') as file:
+            return file.readlines()
+
+# loads cached GetBugs results, returns empty cache if nothing has been saved yet
+def loadCache(cachePath):
+    if not os.path.exists(cachePath):
+        return {}
+    with open(cachePath, 'r') as f:
+        return json.load(f)
+
+def saveCache(cachePath, cache):
+    SafeFile.saveJson(cachePath, cache, indent=1)
+
+# returns dictionary of test name to lines of Bugs.txt for each test
+# results younger than ttl seconds are read from the cache, the rest are looked up with up to workers GetBugs calls at a time
+# a failed lookup is not cached, so it is looked up again on the next run, and the test keeps its older cached result
+# if it has one and is None otherwise
+def getBugs(tests, command, key, cachePath, ttl, workers):
+    cache = loadCache(cachePath)
+    now = time.time()
+    lookups = [test for test in tests if test not in cache or now - cache[test]["time"] > ttl]
+
+    def lookup(test):
+        try:
+            return runGetBugs(command, test, key)
+        except OSError as e:
+            print("GetBugs failed for " + test + ": " + str(e))
+            return None
+
+    if len(lookups) > 0:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for test, lines in zip(lookups, pool.map(lookup, lookups)):
+                if lines is not None:
+                    cache[test] = {"time": now, "lines": lines}
+        saveCache(cachePath, cache)
+
+    testBugs = {}
+    for test in tests:
+        if test in cache:
+            testBugs[test] = cache[test]["lines"]
+        else:
+            testBugs[test] = None
+    return testBugs
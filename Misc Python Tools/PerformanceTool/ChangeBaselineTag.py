@@ -1,4 +1,12 @@
+import argparse
 import os
+import IngestionCursor
+import LogSync
+
+parser = argparse.ArgumentParser(description = "Rename a scenario in the performance logs")
+parser.add_argument("--cache", default = '', help = "Directory to mirror each machine's logs into and read them from")
+parser.add_argument("--logs", default = '', help = "Location of the files saved by Performance.py, so the renamed logs are read again from the start on its next run")
+args = parser.parse_args()
 
 machinesPath = input("Enter file location of Machines.txt (Default: D:\\git\\Disco\\Tools\\PerformanceTool\\Machines.txt):\n")
 if machinesPath == '' or machinesPath == ' ':
@@ -32,19 +40,27 @@ for tester in machinesText:
 
     #get path of log, and _performance files
     if os.path.exists(path):
+        #read the log from the local cache after copying new data into it if --cache is set
+        readPath = path
+        if args.cache != '':
+            readPath = LogSync.machineCache(args.cache, pathList[2])
+            LogSync.syncMachine(path, readPath)
         for log in os.listdir(path):
             if log == testName + ".log":
-                logPaths.append(path + "\\" + log)
+                logPaths.append([path + "\\" + log, readPath + "\\" + log])
             if log == testName + "_performance.csv":
                 csvPaths.append(path + "\\" + log)
 
-#change tag in log files
-for test in logPaths:
-    with open(test, "r+") as fd:
+#change tag in log files, writing to the machine and to the cached copy
+for test, readTest in logPaths:
+    with open(readTest, "r+") as fd:
         filedata = fd.read()
         filedata = filedata.replace(", " + oldName + ",", ", " + newName + ",")
-    with open(test, "w") as fd:
-        fd.write(filedata)
+    if args.cache != '':
+        LogSync.writeLog(test, readTest, filedata)
+    else:
+        with open(test, "w") as fd:
+            fd.write(filedata)
 
 #change tag in _performance.csv files
 for test in csvPaths:
@@ -53,3 +69,7 @@ for test in csvPaths:
         filedata = filedata.replace("\n" + oldName + ",", "\n" + newName + ",")
     with open(test, "w") as fd:
         fd.write(filedata)
+
+#the renamed logs keep their size, so make sure Performance.py reads them again and recalculates the test's baselines
+if args.logs != '' and len(logPaths) > 0:
+    IngestionCursor.markRewritten(args.logs, testName + ".log")
@@ -0,0 +1,111 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+import IngestionCursor
+import MachinePool
+import SafeFile
+
+# keeps the PerformanceTool outputs up to date by running Performance.py whenever a machine's logs change
+# usage: CollectionDaemon.py --logs C:\ANSYSDev\PerformanceLogging --machines Machines.txt --install 24.1 --interval 10
+toolPath = os.path.dirname(os.path.abspath(__file__))
+
+# returns size and modified time of every log in a machine's directory, None if the directory does not exist
+def pollMachine(path):
+    if not os.path.exists(path):
+        return None
+    logs = {}
+    for name in os.listdir(path):
+        if name.endswith(".log"):
+            logs[name] = SafeFile.fileStat(os.path.join(path, name))
+    return logs
+
+# returns the logs of every machine in Machines.txt as {machine: logs}, machines that could not be polled are None
+# Machines.txt is read again every time so machines can be added without restarting
+def pollMachines(machinesPath, workers, timeout):
+    with open(machinesPath, 'r') as f:
+        paths = [MachinePool.machinePath(line) for line in f.readlines()[1:] if line.strip() != '']
+    polls, skipped = MachinePool.runTasks(pollMachine, [[path] for path, machine in paths], workers, timeout)
+    return {machine: polls[index] for index, (path, machine) in enumerate(paths)}
+
+# returns the number of logs whose size or modified time is different in two polls
+def changedLogs(previous, current):
+    changed = 0
+    for machine, logs in current.items():
+        before = previous.get(machine) or {}
+        for name, stat in (logs or {}).items():
+            if before.get(name) != stat:
+                changed += 1
+    return changed
+
+# runs Performance.py once and returns its exit code
+# it runs in its own process group so stopping the daemon with Ctrl+C lets the collection finish and save its state
+# it runs in the daemon's working directory, so relative paths in the arguments and Machines.txt mean the same to both
+def collect(arguments):
+    if os.name == "nt":
+        options = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        options = {"start_new_session": True}
+    process = subprocess.Popen([sys.executable, os.path.join(toolPath, "Performance.py")] + arguments, **options)
+    try:
+        return process.wait()
+    except KeyboardInterrupt:
+        print("Stopping once the running collection finishes")
+        process.wait()
+        raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run Performance.py whenever performance logs change")
+    parser.add_argument("--logs", default = '', help = "Location of performance logs and where files will be saved")
+    parser.add_argument("--machines", default = '', help = "Location of Machines.txt file")
+    parser.add_argument("--install", default = '', help = "Version number recorded with new results")
+    parser.add_argument("--interval", type = float, default = 10, help = "Seconds between polls of the machines' log directories")
+    parser.add_argument("--max-bytes", type = int, default = 16 * 1024 * 1024, help = "Most new bytes of logs each collection takes on before putting logs off to the next one")
+    parser.add_argument("--workers", type = int, default = 1, help = "Number of machines to poll and read from at the same time")
+    parser.add_argument("--timeout", type = float, default = 600, help = "Seconds to wait for a machine before skipping it")
+    parser.add_argument("--store", action = "store_true", help = "Keep results in Performance.db and export Performance.csv from it")
+    parser.add_argument("--cache", default = '', help = "Directory to mirror each machine's logs into before reading them locally")
+    parser.add_argument("--query-index", action = "store_true", help = "Keep Performance.db and the query index up to date for PerfQuery after each collection")
+    parser.add_argument("--cycles", type = int, default = 0, help = "Stop after this many polls, 0 runs until stopped")
+    args = parser.parse_args()
+    if args.logs == '' or args.machines == '':
+        parser.error("--logs and --machines are required")
+
+    arguments = ["--logs", args.logs, "--machines", args.machines, "--install", args.install, "--max-bytes", str(args.max_bytes),
+        "--workers", str(args.workers), "--timeout", str(args.timeout)]
+    if args.store:
+        arguments.append("--store")
+    if args.query_index:
+        arguments.append("--query-index")
+    if args.cache != '':
+        arguments += ["--cache", args.cache]
+
+    # nothing about the logs is kept between restarts, the first poll always collects and Performance.py only reads
+    # what its saved cursors have not seen yet, which makes a restart cost the same as any other collection
+    lastPoll = None
+    cycle = 0
+    try:
+        while args.cycles == 0 or cycle < args.cycles:
+            cycle += 1
+            begin = time.monotonic()
+            poll = pollMachines(args.machines, args.workers, args.timeout)
+
+            # logs put off by the last collection are collected again without waiting for them to change
+            deferred = IngestionCursor.loadState(args.logs).get("deferred", 0) if os.path.exists(args.logs) else 0
+            if lastPoll is None or poll != lastPoll or deferred > 0:
+                changed = changedLogs(lastPoll or {}, poll)
+                print("[{}] Collecting {} changed logs and {} put off logs".format(datetime.now().strftime("%m/%d/%Y %I:%M:%S %p"), changed, deferred))
+                collectBegin = time.monotonic()
+                code = collect(arguments)
+                if code == 0:
+                    # the poll was taken before the collection, so logs that changed while it ran are collected next time
+                    lastPoll = poll
+                    print("Collected in {:.1f} s".format(time.monotonic() - collectBegin))
+                else:
+                    print("Performance.py failed with exit code {}, trying again after the next poll".format(code))
+            if args.cycles == 0 or cycle < args.cycles:
+                time.sleep(max(0, args.interval - (time.monotonic() - begin)))
+    except KeyboardInterrupt:
+        print("Stopped")
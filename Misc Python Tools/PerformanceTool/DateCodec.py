@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+# ordinal of every date string that has been parsed
+ordinals = {}
+
+# returns the ordinal of a date in mm/dd/yyyy format, each distinct string is only parsed once
+def toOrdinal(date):
+    try:
+        return ordinals[date]
+    except KeyError:
+        ordinals[date] = datetime.strptime(date, "%m/%d/%Y").toordinal()
+        return ordinals[date]
+
+# returns an ordinal as a date in mm/dd/yyyy format
+def toDate(ordinal):
+    return datetime.fromordinal(ordinal).strftime("%m/%d/%Y")
+
+# returns the ordinal of today's date
+def today():
+    return datetime.today().toordinal()
+
+# returns the ordinal of the first date that is not more than days before the current time
+# dates are treated as midnight, so the date exactly days ago is only included at exactly midnight
+def windowStart(days):
+    dateCutoff = datetime.today() - timedelta(days=days)
+    firstDate = dateCutoff.toordinal()
+    if dateCutoff.time() != datetime.min.time():
+        firstDate += 1
+    return firstDate
+
+# compares parsing the dates of a synthetic history with strptime and with toOrdinal
+if __name__ == "__main__":
+    import random
+    import time
+
+    rows = 1000000
+    start = datetime.today().toordinal() - 365
+    dates = [datetime.fromordinal(start + random.randrange(365)).strftime("%m/%d/%Y") for _ in range(rows)]
+
+    begin = time.perf_counter()
+    for date in dates:
+        datetime.strptime(date, "%m/%d/%Y")
+    strptimeTime = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    for date in dates:
+        toOrdinal(date)
+    codecTime = time.perf_counter() - begin
+
+    print("strptime: {:.3f} s".format(strptimeTime))
+    print("toOrdinal: {:.3f} s".format(codecTime))
+    print("Speedup: {:.1f}x".format(strptimeTime / codecTime))
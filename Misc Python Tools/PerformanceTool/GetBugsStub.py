@@ -0,0 +1,20 @@
+import json
+import os
+import sys
+
+# stands in for GetBugs.exe so the report can be run without access to TFS
+# usage: GetBugsStub.py <test name> <output directory> <key>
+# bugs for each test are read from the JSON file in GETBUGS_STUB_DATA, formatted as {"test name": ["bug", ...]}
+
+testName = sys.argv[1]
+outputPath = sys.argv[2]
+
+bugs = {}
+if "GETBUGS_STUB_DATA" in os.environ:
+    with open(os.environ["GETBUGS_STUB_DATA"], 'r') as f:
+        bugs = json.load(f)
+
+with open(os.path.join(outputPath, "Bugs.txt"), 'w') as f:
+    f.write("Bugs for " + testName + ":\n")
+    for bug in bugs.get(testName, []):
+        f.write(bug + "\n")
@@ -0,0 +1,127 @@
+import html
+import math
+import ReportModel
+
+# size of each scenario's chart and the space left around the plot for tick labels, in pixels
+chartWidth = 560
+chartHeight = 240
+margin = {"left": 52, "right": 10, "top": 24, "bottom": 28}
+
+# most date labels shown under a chart, matching the pdf report
+maxNumTicks = 15
+
+# colors of the pdf report
+navy = "#012456"
+red = "#8d2424"
+green = "#005C00"
+
+style = """
+body { font-family: Arial, Helvetica, sans-serif; margin: 0; color: black; }
+.title { background: %s; color: white; padding: 12px 16px; display: flex; justify-content: space-between; }
+.title h1 { font-size: 28px; font-weight: normal; margin: 0 0 6px 0; }
+.title div { font-size: 13px; white-space: pre-line; }
+.panel { display: flex; gap: 24px; padding: 16px; border-bottom: 1px solid #dddddd; }
+.text { font-size: 13px; white-space: pre-line; }
+.test { color: %s; font-size: 16px; font-weight: bold; }
+.scenario { color: %s; font-size: 13px; margin-bottom: 4px; }
+.notes { color: %s; }
+.footer { background: %s; height: 12px; }
+""" % (navy, navy, navy, red, navy)
+
+# returns about count evenly spaced round values covering low to high
+def niceTicks(low, high, count=6):
+    if high <= low:
+        return [low]
+    step = (high - low) / count
+    power = 10 ** math.floor(math.log10(step))
+    for multiple in [1, 2, 5, 10]:
+        if multiple * power >= step:
+            step = multiple * power
+            break
+    first = math.ceil(low / step) * step
+    return [first + index * step for index in range(int((high - first) / step + 1e-9) + 1)]
+
+# returns text of a number for a tick label without trailing zeros
+def tickText(value):
+    return "{:g}".format(round(value, 6))
+
+# returns the svg chart of a panel's daily times with its baselines, and the range and median to p90 band of each day
+def chartSvg(panel):
+    values = list(panel["times"]) + [panel["baseline"], panel["historicalBaseline"]]
+    for band in ["min", "max"]:
+        values += panel["bands"][band]
+    low = min(values)
+    high = max(values)
+    padding = (high - low) * 0.05 or abs(high) * 0.05 or 1
+    low -= padding
+    high += padding
+    plotWidth = chartWidth - margin["left"] - margin["right"]
+    plotHeight = chartHeight - margin["top"] - margin["bottom"]
+    count = len(panel["dates"])
+
+    def x(index):
+        if count == 1:
+            return margin["left"] + plotWidth / 2
+        return margin["left"] + plotWidth * index / (count - 1)
+
+    def y(value):
+        return margin["top"] + plotHeight * (high - value) / (high - low)
+
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" font-size="10">' % (chartWidth, chartHeight)]
+    parts.append('<rect x="%d" y="%d" width="%d" height="%d" fill="none" stroke="black" stroke-width="0.8"/>'
+        % (margin["left"], margin["top"], plotWidth, plotHeight))
+
+    # value ticks on the left and date ticks along the bottom
+    for tick in niceTicks(low, high):
+        parts.append('<line x1="%d" x2="%d" y1="%.1f" y2="%.1f" stroke="black" stroke-width="0.8"/>' % (margin["left"] - 4, margin["left"], y(tick), y(tick)))
+        parts.append('<text x="%d" y="%.1f" text-anchor="end" dominant-baseline="middle">%s</text>' % (margin["left"] - 6, y(tick), tickText(tick)))
+    step = max(1, math.ceil(count / maxNumTicks))
+    for index in range(0, count, step):
+        parts.append('<text x="%.1f" y="%d" text-anchor="middle">%s</text>' % (x(index), chartHeight - margin["bottom"] + 14, html.escape(panel["dates"][index])))
+
+    # shade the range of each day's times and the band from its median to p90 when a scenario ran more than once a day
+    bands = panel["bands"]
+    if len(bands["max"]) > 0 and bands["max"] != bands["min"]:
+        for lower, upper, opacity in [["min", "max", 0.12], ["median", "p90", 0.3]]:
+            points = [(x(index), y(value)) for index, value in enumerate(bands[upper])]
+            points += [(x(index), y(value)) for index, value in reversed(list(enumerate(bands[lower])))]
+            parts.append('<polygon points="%s" fill="%s" fill-opacity="%.2f"/>' % (" ".join("%.1f,%.1f" % point for point in points), navy, opacity))
+
+    # baselines across the whole chart, then the daily times
+    for value, color in [[panel["historicalBaseline"], red], [panel["baseline"], green]]:
+        parts.append('<line x1="%d" x2="%d" y1="%.1f" y2="%.1f" stroke="%s" stroke-width="1.3"/>' % (margin["left"], margin["left"] + plotWidth, y(value), y(value), color))
+    points = " ".join("%.1f,%.1f" % (x(index), y(value)) for index, value in enumerate(panel["times"]))
+    parts.append('<polyline points="%s" fill="none" stroke="%s" stroke-width="1"/>' % (points, navy))
+    for index, value in enumerate(panel["times"]):
+        parts.append('<circle cx="%.1f" cy="%.1f" r="2.2" fill="%s"><title>%s: %.3f</title></circle>' % (x(index), y(value), navy, html.escape(panel["dates"][index]), value))
+
+    # legend in the top left like the pdf report
+    for offset, label, color in [[0, "Historical Baseline", red], [130, "Test Baseline", green]]:
+        parts.append('<line x1="%d" x2="%d" y1="12" y2="12" stroke="%s" stroke-width="1.3"/>' % (margin["left"] + offset, margin["left"] + offset + 20, color))
+        parts.append('<text x="%d" y="12" dominant-baseline="middle">%s</text>' % (margin["left"] + offset + 24, label))
+    parts.append('</svg>')
+    return "".join(parts)
+
+# returns the html of one scenario's chart and text
+def panelHtml(panel):
+    return ('<div class="panel">' + chartSvg(panel) + '<div class="text"><div class="test">' + html.escape(panel["testName"]) + '</div>'
+        + '<div class="scenario">' + html.escape(panel["scenario"]) + '</div>' + html.escape(ReportModel.resultText(panel).lstrip("\n"))
+        + '<div class="notes">' + html.escape(ReportModel.noteText(panel)) + '</div></div></div>')
+
+# creates a single html file with an svg chart and the results of each scenario, from the same pages as the pdf report
+def renderHtml(pages, header, savePath):
+    panels = [panel for panels in pages for panel in panels]
+    details = "Machine: " + ",".join(header["machines"]) + "\nDate: " + header["date"]
+    parts = ['<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Performance Report ' + html.escape(header["date"]) + '</title>',
+        '<style>' + style + '</style></head><body>',
+        '<div class="title"><div><h1>Performance Report</h1><div>' + html.escape(details) + '</div></div>']
+    if "factors" in header:
+        parts.append('<div>' + html.escape(header["factors"]) + '</div>')
+    parts.append('</div>')
+    for panel in panels:
+        parts.append(panelHtml(panel))
+    if len(panels) == 0:
+        parts.append('<div class="panel text">No performance scenarios flagged on ' + html.escape(header["date"]) + '.\nSee Power BI for detailed performance results.</div>')
+    parts.append('<div class="footer"></div></body></html>\n')
+    with open(savePath, 'w', encoding="utf-8") as f:
+        f.write("\n".join(parts))
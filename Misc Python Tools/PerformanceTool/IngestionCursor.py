@@ -0,0 +1,89 @@
+import hashlib
+import json
+import locale
+import os
+import SafeFile
+
+# name of the file that stores ingestion progress, saved next to the _performance.csv files
+stateFileName = "Ingestion State.json"
+
+# returns hash of a raw line from a log, used to check that a log has not been rewritten since the last run
+def lineHash(line):
+    return hashlib.sha1(line).hexdigest()
+
+# loads saved cursors, returns empty state if nothing has been saved yet
+def loadState(path):
+    statePath = os.path.join(path, stateFileName)
+    if not os.path.exists(statePath):
+        return {"cursors": {}}
+    with open(statePath, 'r') as f:
+        state = json.load(f)
+    state.setdefault("cursors", {})
+    return state
+
+# saves state for the next run
+def saveState(path, state):
+    SafeFile.saveJson(os.path.join(path, stateFileName), state, indent=1)
+
+# returns the byte offset to start reading a log from and whether the log was rewritten
+# offset is None if the log has not changed since the cursor was saved
+# logs are only ever appended to, so a log that was modified without growing, shrank, or whose last ingested line
+# no longer matches was rewritten and is read from the start
+def checkLog(logPath, cursor):
+    stat = os.stat(logPath)
+    if cursor is None:
+        return 0, False
+    if stat.st_size == cursor["size"]:
+        if stat.st_mtime == cursor["mtime"]:
+            return None, False
+        return 0, True
+    if stat.st_size < cursor["offset"]:
+        return 0, True
+    with open(logPath, 'rb') as f:
+        f.seek(cursor["lastLine"])
+        lastLine = f.read(cursor["offset"] - cursor["lastLine"])
+    if lineHash(lastLine) != cursor["hash"]:
+        return 0, True
+    return cursor["offset"], False
+
+# returns the cursor of a log that has been read up to offset, given the start and bytes of the last line that was read
+def newCursor(stat, offset, lastLine, line):
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "offset": offset,
+        "lastLine": lastLine,
+        "hash": lineHash(line)
+        }
+
+# returns the cursor to keep for a log that had no complete lines to read
+def unchangedCursor(cursor):
+    if cursor is None:
+        return {"size": 0, "mtime": 0, "offset": 0, "lastLine": 0, "hash": lineHash(b"")}
+    return cursor
+
+# reads all complete lines of a log after offset and returns them with the updated cursor
+# cursor is the saved cursor of the log, or None when reading from the start
+# a line without a newline may still be being written by the tester, so it is left for the next run
+def readLog(logPath, offset, cursor=None):
+    stat = os.stat(logPath)
+    with open(logPath, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    if end == 0:
+        return [], unchangedCursor(cursor)
+    lastLine = data.rfind(b"\n", 0, end - 1) + 1
+    cursor = newCursor(stat, offset + end, offset + lastLine, data[lastLine:end])
+    text = data[:end].decode(locale.getpreferredencoding(False)).replace("\r\n", "\n")
+    return [line + "\n" for line in text.split("\n")[:-1]], cursor
+
+# marks the cursors of every log with a file name so the logs are treated as rewritten on the next run
+# used by the tools that edit logs in place, the cursors are found by name because they are keyed by the path each log was read from
+def markRewritten(path, logName):
+    state = loadState(path)
+    for logPath, cursor in state["cursors"].items():
+        if logPath.replace("\\", "/").split("/")[-1] == logName:
+            cursor["size"] = -1
+            cursor["hash"] = ""
+    saveState(path, state)
@@ -0,0 +1,90 @@
+import cProfile
+import os
+import sys
+import threading
+import time
+
+# time taken and counter changes of each finished stage as [name, seconds, counters]
+stages = []
+
+# totals of things counted since the program started, such as files, lines, bytes and rows
+counters = {}
+
+# name, start time and counters at the start of the stage that is running
+current = None
+
+# profiler, sampling thread and output path while --profile is running
+profile = None
+
+# adds amount to a counter, meant to be called once per file or batch of lines rather than once per line
+def count(name, amount=1):
+    counters[name] = counters.get(name, 0) + amount
+
+# ends the running stage and starts timing a new one
+def stage(name):
+    global current
+    finish()
+    current = [name, time.perf_counter(), dict(counters)]
+
+# ends the running stage and prints a one line summary of its time and the counters that changed during it
+def finish():
+    global current
+    if current is None:
+        return
+    name, begin, before = current
+    current = None
+    changed = {}
+    for counter in counters:
+        if counters[counter] != before.get(counter, 0):
+            changed[counter] = counters[counter] - before.get(counter, 0)
+    stages.append([name, time.perf_counter() - begin, changed])
+    summary = "[stage] " + name + ": {:.3f} s".format(stages[-1][1])
+    for counter in changed:
+        summary += ", " + counter + "=" + str(changed[counter])
+    print(summary)
+
+# returns the name of a frame as it is shown in a flame graph
+def frameName(frame):
+    return os.path.basename(frame.f_code.co_filename) + ":" + frame.f_code.co_name
+
+# records the stack of every other thread every interval seconds until stop is set
+def sampleStacks(stacks, stop, interval):
+    sampler = threading.get_ident()
+    while not stop.wait(interval):
+        for thread, frame in sys._current_frames().items():
+            if thread == sampler:
+                continue
+            names = []
+            while frame is not None:
+                names.append(frameName(frame))
+                frame = frame.f_back
+            stack = ";".join(reversed(names))
+            stacks[stack] = stacks.get(stack, 0) + 1
+
+# starts profiling the main thread with cProfile and sampling the stacks of all threads
+# results are written by stopProfile to path + ".pstats" and path + ".folded"
+def startProfile(path, interval=0.005):
+    global profile
+    stacks = {}
+    stop = threading.Event()
+    sampler = threading.Thread(target=sampleStacks, args=(stacks, stop, interval), daemon=True)
+    profiler = cProfile.Profile()
+    profile = {"path": path, "profiler": profiler, "stacks": stacks, "stop": stop, "sampler": sampler}
+    sampler.start()
+    profiler.enable()
+
+# stops profiling and writes the pstats file and the collapsed stacks, one "frame;frame;frame count" line per stack,
+# which can be drawn with flamegraph.pl or speedscope
+def stopProfile():
+    global profile
+    if profile is None:
+        return
+    profile["profiler"].disable()
+    profile["stop"].set()
+    profile["sampler"].join()
+    profile["profiler"].dump_stats(profile["path"] + ".pstats")
+    with open(profile["path"] + ".folded", 'w') as f:
+        for stack, samples in sorted(profile["stacks"].items()):
+            f.write(stack + " " + str(samples) + "\n")
+    print("Profile saved to: " + profile["path"] + ".pstats, " + profile["path"] + ".folded")
+    profile = None
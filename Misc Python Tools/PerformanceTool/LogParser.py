@@ -0,0 +1,176 @@
+import csv
+import locale
+import os
+import re
+from datetime import datetime
+
+# name of the file that malformed log lines are copied to, saved next to the _performance.csv files
+quarantineFileName = "Quarantined Lines.csv"
+
+# a log line is "date time, scenario, baseline, measured" where baseline and measured are H:MM:SS or seconds
+# anything after another ", " following the measured time is ignored, and lines may end with \r\n
+# lines that do not match the fields are still matched as a whole with every group set to None, so lines can be found with finditer
+# baselines repeat, so they are only loosely matched here and checked against durationPattern the first time each one is seen
+linePattern = re.compile(rb"(?m)^(?:(\d{1,2}/\d{1,2}/\d{4})(?: [^,\r\n]*)?, ([^,\r\n]+(?:,(?! )[^,\r\n]*)*), ([\d:. \t]+), "
+    rb"[ \t]*(?:(\d+):(\d+):(\d+(?:\.\d*)?)|(\d+(?:\.\d*)?))[ \t]*(?:, [^\r\n]*)?\r?$|.*$)")
+
+# patterns used to check baselines and to explain why a line was quarantined
+datePattern = re.compile(rb"\d{1,2}/\d{1,2}/\d{4}")
+durationPattern = re.compile(rb"[ \t]*(?:\d+:\d+:\d+(?:\.\d*)?|\d+(?:\.\d*)?)[ \t]*\r?")
+
+# returns the number of seconds in a duration formatted as H:MM:SS or as seconds
+def durationSeconds(text):
+    parts = text.strip().split(b":")
+    if len(parts) == 1:
+        return float(parts[0])
+    return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+
+# returns the reason a line does not match linePattern
+def problem(line):
+    fields = line.rstrip(b"\r").split(b", ", 4)
+    if len(fields) < 4:
+        return "expected 4 fields, found " + str(len(fields))
+    if not datePattern.fullmatch(fields[0].split(b" ")[0]):
+        return "invalid date"
+    if not durationPattern.fullmatch(fields[2]):
+        return "invalid baseline"
+    if not durationPattern.fullmatch(fields[3]):
+        return "invalid time"
+    return "invalid scenario"
+
+# returns an empty cache for parseLines, holding the text of each date and scenario and the seconds of each baseline
+def newCache():
+    return [{}, {}]
+
+# yields (date, scenario, time, baseline time) of each line between start and end of buffer, which must only hold whole lines
+# cache is from newCache and can be shared by calls on the same log, so each date, scenario and baseline is only converted once
+# malformed lines are skipped and added to malformed as (position, line, reason), blank lines are skipped silently
+def parseLines(buffer, start, end, cache, malformed, encoding, newestFirst=False):
+    texts, baseTimes = cache
+    matches = linePattern.finditer(buffer, start, end)
+    if newestFirst:
+        matches = reversed(list(matches))
+    for fields in matches:
+        date, scenario, baseline, hours, minutes, seconds, totalSeconds = fields.groups()
+        reason = None
+        if date is None:
+            reason = ""
+        elif scenario not in texts:
+            try:
+                texts[scenario] = scenario.decode(encoding)
+            except UnicodeDecodeError:
+                reason = "scenario is not " + encoding
+        if reason is None and baseline not in baseTimes:
+            if durationPattern.fullmatch(baseline):
+                baseTimes[baseline] = durationSeconds(baseline)
+            else:
+                reason = "invalid baseline"
+        if reason is not None:
+            line = fields.group().rstrip(b"\r")
+            if line.strip() != b"":
+                malformed.append((fields.start(), line.decode(encoding, "replace"), reason or problem(line)))
+            continue
+        if date not in texts:
+            texts[date] = date.decode("ascii")
+        if totalSeconds is None:
+            time = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        else:
+            time = float(totalSeconds)
+        yield texts[date], texts[scenario], time, baseTimes[baseline]
+
+# returns (date, scenario, time, baseline time) of one line of text or bytes, or None if the line is malformed
+def parseLine(line, encoding=None):
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+    if isinstance(line, str):
+        line = line.encode(encoding)
+    line = line.rstrip(b"\n")
+    for fields in parseLines(line, 0, len(line), newCache(), [], encoding):
+        return fields
+    return None
+
+# appends malformed lines of a log to the quarantine file as date found, log, line number, reason and line
+# lines that are already in the file for the same log are not added again, such as when a log is read from the start
+def quarantine(path, logPath, malformed):
+    quarantinePath = os.path.join(path, quarantineFileName)
+    existing = set()
+    if os.path.exists(quarantinePath):
+        with open(quarantinePath, 'r', newline='') as f:
+            for row in csv.reader(f):
+                existing.add((row[1], row[4]))
+    with open(quarantinePath, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if len(existing) == 0 and f.tell() == 0:
+            writer.writerow(["Date Found", "Log", "Line", "Reason", "Text"])
+        found = datetime.today().strftime("%m/%d/%Y")
+        for number, line, reason in malformed:
+            if (logPath, line) not in existing:
+                writer.writerow([found, logPath, number, reason, line])
+                existing.add((logPath, line))
+
+# checks every line of the corpus next to this file against its expected fields or reason,
+# then compares the time to parse the good lines with the split() calls the parser replaced
+if __name__ == "__main__":
+    import json
+    import time
+
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Log Corpus.json"), 'r', encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    failures = 0
+    for case in corpus["good"]:
+        fields = parseLine(case["line"], "utf-8")
+        if fields is None or list(fields) != case["fields"]:
+            failures += 1
+            print("FAIL good: " + repr(case["line"]) + " parsed as " + repr(fields))
+    for case in corpus["bad"]:
+        malformed = []
+        line = case["line"].encode("utf-8")
+        list(parseLines(line, 0, len(line), newCache(), malformed, "utf-8"))
+        if len(malformed) != 1 or malformed[0][2] != case["reason"]:
+            failures += 1
+            print("FAIL bad: " + repr(case["line"]) + " gave " + repr(malformed))
+    print(str(len(corpus["good"]) + len(corpus["bad"]) - failures) + " of " + str(len(corpus["good"]) + len(corpus["bad"])) + " corpus lines passed")
+
+    # the parsing Performance.py used before this parser, which only handles H:MM:SS baselines
+    def time_to_sec(time):
+        if time == '':
+            return 0
+        else:
+            holder = time.strip().split(":")
+            if len(holder) == 1:
+                return float(holder[0])
+            hour = int(holder[0])
+            minute = int(holder[1])
+            sec = float(holder[2])
+            return hour * 3600 + minute * 60 + sec
+
+    def splitLine(line):
+        splitData = line.split(", ", 3)
+        baseline = splitData[2].split(':')
+        baseTime = int(baseline[0]) * 3600 + int(baseline[1]) * 60 + float(baseline[2])
+        return splitData[0].split(" ")[0], splitData[1], time_to_sec(splitData[3].split(", ")[0]), baseTime
+
+    def splits(line):
+        try:
+            splitLine(line)
+            return True
+        except (IndexError, ValueError):
+            return False
+
+    lines = [case["line"] + "\n" for case in corpus["good"] if splits(case["line"])] * 20000
+    buffer = "".join(lines).encode("utf-8")
+    splitTime = None
+    parseTime = None
+    for _ in range(3):
+        begin = time.perf_counter()
+        for line in buffer.decode("utf-8").split("\n")[:-1]:
+            splitLine(line)
+        splitTime = min(time.perf_counter() - begin, splitTime or float("inf"))
+        begin = time.perf_counter()
+        for fields in parseLines(buffer, 0, len(buffer), newCache(), [], "utf-8"):
+            pass
+        parseTime = min(time.perf_counter() - begin, parseTime or float("inf"))
+    print("split(): {:.3f} s, parseLines: {:.3f} s for {} lines".format(splitTime, parseTime, len(lines)))
+    if failures > 0:
+        raise SystemExit(1)
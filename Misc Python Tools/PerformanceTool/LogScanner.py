@@ -0,0 +1,62 @@
+import locale
+import mmap
+import os
+import IngestionCursor
+import LogParser
+
+# size of the pieces a log is scanned in, so only the matches of one piece are held at a time
+chunkSize = 1 << 20
+
+# maps the complete lines of a log after offset and returns them as [mapping, offset, end] with the updated cursor
+# the block is None if there are no complete lines to read
+# every page of the new lines is touched here so they are read from the share while the machine's timeout applies,
+# without copying them into Python objects
+def mapLog(logPath, offset, cursor=None):
+    with open(logPath, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size <= offset:
+            return None, IngestionCursor.unchangedCursor(cursor)
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    end = mapping.rfind(b"\n", offset) + 1
+    if end == 0:
+        mapping.close()
+        return None, IngestionCursor.unchangedCursor(cursor)
+    mapping.find(b"\0", offset, end)
+    lastLine = max(mapping.rfind(b"\n", offset, end - 1) + 1, offset)
+    return [mapping, offset, end], IngestionCursor.newCursor(stat, end, lastLine, mapping[lastLine:end])
+
+# yields the start and end of pieces of a block of about chunkSize bytes that only contain whole lines, newest piece first
+def reverseChunks(block):
+    mapping, offset, end = block
+    while end > offset:
+        start = end - chunkSize
+        if start > offset:
+            start = mapping.rfind(b"\n", offset, start) + 1
+        start = max(start, offset)
+        yield start, end
+        end = start
+
+# returns dictionary of the line number of each line starting at one of positions, only used to report malformed lines
+def lineNumbers(mapping, positions):
+    numbers = {}
+    number = 1
+    previous = 0
+    for position in sorted(positions):
+        number += mapping[previous:position].count(b"\n")
+        numbers[position] = number
+        previous = position
+    return numbers
+
+# yields (date, scenario, time, baseline time) of each line in a block, newest line first
+# malformed lines are skipped and added to malformed as (line number, line, reason), blank lines are skipped silently
+def scanLog(block, malformed, encoding=None):
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+    mapping = block[0]
+    cache = LogParser.newCache()
+    for chunkStart, chunkEnd in reverseChunks(block):
+        chunkMalformed = []
+        yield from LogParser.parseLines(mapping, chunkStart, chunkEnd, cache, chunkMalformed, encoding, newestFirst=True)
+        numbers = lineNumbers(mapping, [position for position, line, reason in chunkMalformed])
+        for position, line, reason in chunkMalformed:
+            malformed.append((numbers[position], line, reason))
@@ -0,0 +1,81 @@
+import os
+import shutil
+
+# bytes of a log and its cached copy compared at a time when checking that the log was only appended to
+chunkSize = 1 << 20
+
+# returns the directory that a machine's logs are cached in
+def machineCache(cachePath, machine):
+    return os.path.join(cachePath, machine)
+
+# returns True if the first size bytes of source still hold what was cached in target
+# every cached byte is compared, since tools like RemoveHistory can change lines anywhere in a log without changing its ends
+def appendedTo(source, target, size):
+    with open(source, 'rb') as s, open(target, 'rb') as t:
+        while size > 0:
+            length = min(chunkSize, size)
+            if s.read(length) != t.read(length):
+                return False
+            size -= length
+        return True
+
+# brings the cached copy of a log up to date and returns the number of bytes copied and whether it was copied in full
+# logs whose size and modified time match the cached copy are not read, logs that grew are copied from the end of the
+# cached copy, and anything else, or any log when force is set, is copied in full
+def syncFile(source, target, force=False):
+    stat = os.stat(source)
+    copied = 0
+    full = False
+    if not force and os.path.exists(target):
+        cached = os.stat(target)
+        if cached.st_size == stat.st_size and cached.st_mtime_ns == stat.st_mtime_ns:
+            return 0, False
+        if cached.st_size < stat.st_size and appendedTo(source, target, cached.st_size):
+            with open(source, 'rb') as s, open(target, 'ab') as t:
+                s.seek(cached.st_size)
+                while True:
+                    data = s.read(1 << 20)
+                    if not data:
+                        break
+                    t.write(data)
+                    copied += len(data)
+        else:
+            full = True
+    else:
+        full = True
+    if full:
+        shutil.copyfile(source, target)
+        copied = os.stat(target).st_size
+
+    # the cached copy keeps the modified time of the log so unchanged logs are skipped on the next sync
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return copied, full
+
+# mirrors the .log files in a machine's directory into its cache directory and returns the number of bytes copied,
+# logs appended to, and logs copied in full, or None if the directory does not exist
+# cached logs that are no longer in the machine's directory are removed
+def syncMachine(path, cachePath):
+    if not os.path.exists(path):
+        return None
+    os.makedirs(cachePath, exist_ok=True)
+    logs = [log for log in os.listdir(path) if log.endswith(".log")]
+    totals = {"bytes": 0, "appended": 0, "copied": 0}
+    for log in logs:
+        copied, full = syncFile(os.path.join(path, log), os.path.join(cachePath, log))
+        totals["bytes"] += copied
+        if full:
+            totals["copied"] += 1
+        elif copied > 0:
+            totals["appended"] += 1
+    for log in os.listdir(cachePath):
+        if log.endswith(".log") and log not in logs:
+            os.remove(os.path.join(cachePath, log))
+    return totals
+
+# writes text to a log and to its cached copy, so the cache stays current without reading the log back from the share
+def writeLog(source, target, text):
+    for path in [source, target]:
+        with open(path, 'w') as f:
+            f.write(text)
+    stat = os.stat(source)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
@@ -0,0 +1,51 @@
+import os
+from datetime import datetime
+import numpy
+import SafeFile
+
+# name of the file that the factors used by the last report are saved to, next to Performance.csv
+factorFileName = "Machine Factors.json"
+
+# fewest scenarios a machine has to share with the reference machine to get a factor
+minimumShared = 3
+
+# returns dictionary of the speed factor of each machine and the number of scenarios it was fit from
+# a machine's factor is the median over the scenarios it shares with the reference machine of its median time divided by the
+# reference machine's median time, so dividing its times by the factor puts them on the reference machine's scale
+# machines that share fewer than minimumShared scenarios with the reference machine are left out
+def fitFactors(rows, reference, machines):
+    lists = {}
+    for scenario, testName, time, dateOrdinal, date, machine, version in rows:
+        if machine in machines:
+            if (scenario, machine) not in lists:
+                lists[(scenario, machine)] = []
+            lists[(scenario, machine)].append(time)
+    medians = {}
+    for key, times in lists.items():
+        medians[key] = numpy.median(times)
+
+    factors = {}
+    for machine in machines:
+        ratios = [medians[(scenario, machine)] / medians[(scenario, reference)] for scenario, other in medians
+            if other == machine and (scenario, reference) in medians and medians[(scenario, reference)] > 0]
+        if machine == reference:
+            factors[machine] = [1.0, len(ratios)]
+        elif len(ratios) >= minimumShared:
+            factors[machine] = [float(numpy.median(ratios)), len(ratios)]
+    return factors
+
+# returns rows with the times of each machine divided by its factor, rows of machines without a factor are left out
+def normalizeRows(rows, factors):
+    normalized = []
+    for scenario, testName, time, dateOrdinal, date, machine, version in rows:
+        if machine in factors:
+            normalized.append((scenario, testName, time / factors[machine][0], dateOrdinal, date, machine, version))
+    return normalized
+
+# saves the factors with the reference machine and the date they were fit on
+def saveFactors(path, reference, factors):
+    SafeFile.saveJson(os.path.join(path, factorFileName), {"date": datetime.today().strftime("%m/%d/%Y"), "reference": reference, "factors": factors}, indent=1)
+
+# returns the factors as text for the report header
+def factorText(reference, factors):
+    return "Normalized to: " + reference + "\nSpeed factors: " + ", ".join(machine + " " + "{:.3f}".format(factors[machine][0]) for machine in factors)
@@ -0,0 +1,94 @@
+import os
+import queue
+import threading
+import time
+
+# returns file path and machine name from a line of Machines.txt
+# network paths are formatted as \\MACHINE\PerformanceLogging, any other path is a local directory named after
+# the folder that contains it, such as C:\Benchmark\MACHINE\PerformanceLogging
+def machinePath(line):
+    line = line.strip()
+    if line.startswith("\\\\"):
+        pathList = line.split("\\")
+        return ["\\\\" + pathList[2] + "\\" + pathList[3], pathList[2]]
+    return [line, os.path.basename(os.path.dirname(os.path.normpath(line)))]
+
+# runs function once for each set of arguments in tasks using up to workers threads
+# returns a list of results in the same order as tasks and a dictionary of the reasons tasks were skipped
+# a task that raises an OSError or runs for longer than timeout seconds is skipped and its result is None
+# timeout is either the same for every task or a list with the seconds left for each task, and tasks without any are not run
+# the seconds each task ran are added to spent if it is given, so one timeout can be shared by several calls
+# any other exception is raised again once every task has finished
+# threads are daemons so a machine that never answers cannot stop the program from exiting
+def runTasks(function, tasks, workers, timeout, spent=None):
+    limits = timeout if isinstance(timeout, list) else [timeout] * len(tasks)
+    timedOut = "timed out" if isinstance(timeout, list) else "timed out after " + str(timeout) + " seconds"
+    results = [None] * len(tasks)
+    finished = {}
+    skipped = {}
+    started = {}
+    errors = []
+    pending = queue.Queue()
+    for index in range(len(tasks)):
+        pending.put(index)
+    lock = threading.Condition()
+
+    def worker():
+        while True:
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                return
+            with lock:
+                if limits[index] <= 0:
+                    skipped[index] = timedOut
+                    finished[index] = True
+                    lock.notify()
+                    continue
+                started[index] = time.monotonic()
+            try:
+                result = function(*tasks[index])
+                error = None
+            except OSError as e:
+                result = None
+                error = str(e)
+            except Exception as e:
+                result = None
+                error = str(e)
+                with lock:
+                    errors.append(e)
+            with lock:
+                # results that arrive after a task timed out are ignored
+                if index not in skipped:
+                    if error is None:
+                        results[index] = result
+                    else:
+                        skipped[index] = error
+                    finished[index] = True
+                    if spent is not None:
+                        spent[index] += time.monotonic() - started[index]
+                lock.notify()
+
+    def startWorker():
+        threading.Thread(target=worker, daemon=True).start()
+
+    for _ in range(min(max(workers, 1), len(tasks))):
+        startWorker()
+
+    with lock:
+        while len(finished) < len(tasks):
+            now = time.monotonic()
+            for index, start in started.items():
+                if index not in finished and now - start > limits[index]:
+                    skipped[index] = timedOut
+                    finished[index] = True
+                    if spent is not None:
+                        spent[index] += limits[index]
+
+                    # the timed out thread may never return, so another thread takes its place
+                    startWorker()
+            lock.wait(0.5)
+
+    if len(errors) > 0:
+        raise errors[0]
+    return results, skipped
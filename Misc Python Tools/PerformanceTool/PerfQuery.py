@@ -0,0 +1,209 @@
+import argparse
+import csv
+import fnmatch
+import json
+import os
+import re
+import sys
+import time
+import numpy
+import DateCodec
+import PerformanceStore
+import SafeFile
+
+# name of the file that holds a copy of the columns of Performance.db as arrays, saved next to Performance.csv
+indexFileName = "Query Index.npz"
+
+# columns of the results table kept in the index and their types, rowid is the order rows were added in
+fields = {"rowid": numpy.int64, "scenario": numpy.int32, "test": numpy.int32, "time": numpy.float64, "date": numpy.int32,
+    "dateText": numpy.int32, "machine": numpy.int32, "version": numpy.int32}
+
+# columns results can be grouped by and the column of the index each one is stored in
+groupColumns = {"scenario": "scenario", "test": "test", "machine": "machine", "version": "version", "date": "dateText"}
+
+# aggregates returned for each group, in the order they are printed
+aggregates = ["count", "mean", "median", "p90", "slope"]
+
+# returns a key that sorts versions by their numbers, so 9.2 comes before 10.1
+def versionKey(version):
+    return [int(number) for number in re.findall(r"\d+", version)], version
+
+# returns rows of the results table as a dictionary of arrays of each field
+def toColumns(rows):
+    rows = numpy.array(rows, dtype=numpy.float64).reshape(-1, len(fields))
+    return {field: rows[:, position].astype(fieldType) for position, (field, fieldType) in enumerate(fields.items())}
+
+# brings Performance.db and the query index up to date with the _performance.csv files in a directory
+# returns the open database, which has the names of the ids in the index, and the columns of the index
+# rows are only ever appended to the database unless it counted a removal, so otherwise only rows after the last one in the index are copied
+def refreshIndex(path):
+    store = PerformanceStore.refreshStore(path)
+    removals = PerformanceStore.removals(store)
+    indexPath = os.path.join(path, indexFileName)
+    columns = None
+    if os.path.exists(indexPath):
+        with numpy.load(indexPath) as saved:
+            if int(saved["removals"]) == removals:
+                columns = {field: saved[field] for field in fields}
+    if columns is None:
+        columns = toColumns([])
+    last = int(columns["rowid"][-1]) if len(columns["rowid"]) > 0 else 0
+    added = store.execute("SELECT rowid, " + ", ".join(list(fields)[1:]) + " FROM results WHERE rowid > ? ORDER BY rowid", (last,)).fetchall()
+
+    # a database that was deleted and built again can match the saved removals, so the index is also checked against the row count
+    count = store.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    if len(columns["rowid"]) + len(added) != count:
+        columns = toColumns(store.execute("SELECT rowid, " + ", ".join(list(fields)[1:]) + " FROM results ORDER BY rowid").fetchall())
+    elif len(added) > 0:
+        addedColumns = toColumns(added)
+        columns = {field: numpy.concatenate([columns[field], addedColumns[field]]) for field in fields}
+    else:
+        return store, columns
+
+    with SafeFile.replacing(indexPath, 'wb') as f:
+        numpy.savez(f, removals=removals, **columns)
+    return store, columns
+
+# returns ids of the names of a text column that pass a check
+def matchingIds(store, column, check):
+    return [id for name, id in store.ids[column].items() if check(name)]
+
+# returns the count, mean, median, p90 and slope of each group of times, given the start of each group
+# times have to be sorted within each group, percentiles are interpolated the same way as numpy.percentile
+# slope is the least squares change in seconds per day, nan when every time of a group is from the same date
+def groupStats(times, dates, starts):
+    counts = numpy.diff(numpy.append(starts, len(times)))
+    means = numpy.add.reduceat(times, starts) / counts
+    stats = {"count": counts, "mean": means}
+    for name, percentile in [["median", 50], ["p90", 90]]:
+        position = (counts - 1) * percentile / 100
+        below = numpy.floor(position).astype(numpy.int64)
+        above = numpy.minimum(below + 1, counts - 1)
+        stats[name] = times[starts + below] + (times[starts + above] - times[starts + below]) * (position - below)
+    offsets = dates - numpy.repeat(numpy.add.reduceat(dates.astype(numpy.float64), starts) / counts, counts)
+    spread = numpy.add.reduceat(offsets * offsets, starts)
+    covariance = numpy.add.reduceat(offsets * (times - numpy.repeat(means, counts)), starts)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        stats["slope"] = numpy.where(spread > 0, covariance / spread, numpy.nan)
+    return stats
+
+# returns the aggregates of the results that pass every filter, grouped by the columns in groupBy
+# scenario is a glob pattern, tests and machines are lists of names, start and end are date ordinals including both,
+# and firstVersion and lastVersion include every version between them in versionKey order
+# each result is a dictionary of the group's names followed by its aggregates, ordered by the group's names
+def query(store, columns, scenario="*", tests=None, machines=None, start=None, end=None, firstVersion=None, lastVersion=None, groupBy=("test", "scenario")):
+    filters = []
+    if scenario != "*":
+        filters.append(["scenario", matchingIds(store, "scenarios", lambda name: fnmatch.fnmatchcase(name, scenario))])
+    if tests is not None:
+        filters.append(["test", matchingIds(store, "tests", lambda name: name in tests)])
+    if machines is not None:
+        filters.append(["machine", matchingIds(store, "machines", lambda name: name in machines)])
+    if firstVersion is not None or lastVersion is not None:
+        low = versionKey(firstVersion) if firstVersion is not None else None
+        high = versionKey(lastVersion) if lastVersion is not None else None
+        filters.append(["version", matchingIds(store, "versions", lambda name: (low is None or versionKey(name) >= low) and (high is None or versionKey(name) <= high))])
+    selected = numpy.ones(len(columns["rowid"]), dtype=bool)
+    for column, ids in filters:
+        selected &= numpy.isin(columns[column], ids)
+    if start is not None:
+        selected &= columns["date"] >= start
+    if end is not None:
+        selected &= columns["date"] <= end
+    if not selected.any():
+        return []
+
+    # rows are sorted by their group ids and then by time so each group is one sorted slice of the arrays
+    keys = [columns[groupColumns[group]][selected] for group in groupBy]
+    times = columns["time"][selected]
+    order = numpy.lexsort([times] + keys[::-1])
+    keys = [key[order] for key in keys]
+    times = times[order]
+    changed = numpy.zeros(len(times) - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+    starts = numpy.concatenate([[0], numpy.flatnonzero(changed) + 1])
+    stats = groupStats(times, columns["date"][selected][order], starts)
+
+    # groups are ordered by the rank of their names, with versions in versionKey order and dates in date order
+    names = [store.names["dates" if group == "date" else group + "s"] for group in groupBy]
+    groupIds = [key[starts] for key in keys]
+    ranks = []
+    for group, groupNames, ids in zip(groupBy, names, groupIds):
+        nameKey = versionKey if group == "version" else DateCodec.toOrdinal if group == "date" else str
+        rank = numpy.zeros(max(groupNames) + 1, dtype=numpy.int64)
+        rank[sorted(groupNames, key=lambda id: nameKey(groupNames[id]))] = numpy.arange(len(groupNames))
+        ranks.append(rank[ids])
+    order = numpy.lexsort(ranks[::-1]) if len(ranks) > 0 else numpy.arange(len(starts))
+
+    groupIds = [ids[order].tolist() for ids in groupIds]
+    statLists = {name: values[order].tolist() for name, values in stats.items()}
+    results = []
+    for position in range(len(starts)):
+        result = {}
+        for group, groupNames, ids in zip(groupBy, names, groupIds):
+            result[group] = groupNames[ids[position]]
+        for name in aggregates:
+            result[name] = statLists[name][position]
+        if result["slope"] != result["slope"]:
+            result["slope"] = None
+        results.append(result)
+    return results
+
+# returns the text of an aggregate for table and csv output
+def valueText(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return "{:.4g}".format(value)
+    return str(value)
+
+# writes results as an aligned table, csv or json
+def writeResults(results, groupBy, outputFormat, output):
+    if outputFormat == "json":
+        json.dump(results, output, indent=1)
+        output.write("\n")
+        return
+    header = list(groupBy) + aggregates
+    lines = [[valueText(result[column]) for column in header] for result in results]
+    if outputFormat == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(lines)
+        return
+    widths = [max([len(column)] + [len(line[index]) for line in lines]) for index, column in enumerate(header)]
+    for line in [header] + lines:
+        # names are left aligned and aggregates right aligned
+        output.write("  ".join(text.ljust(width) if index < len(groupBy) else text.rjust(width) for index, (text, width) in enumerate(zip(line, widths))).rstrip() + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Query performance history")
+    parser.add_argument("--logs", default = '', help = "Location of the _performance.csv files, Performance.db and the query index")
+    parser.add_argument("--scenario", default = "*", help = "Glob pattern of scenario names, such as \"Solve*\"")
+    parser.add_argument("--tests", default = '', help = "Comma separated list of tests")
+    parser.add_argument("--machines", default = '', help = "Comma separated list of machines")
+    parser.add_argument("--start", default = '', help = "First date to include in mm/dd/yyyy format")
+    parser.add_argument("--end", default = '', help = "Last date to include in mm/dd/yyyy format")
+    parser.add_argument("--range", type = int, default = 0, help = "Only include the last this many days, overrides --start")
+    parser.add_argument("--first-version", default = '', help = "First version to include")
+    parser.add_argument("--last-version", default = '', help = "Last version to include")
+    parser.add_argument("--group", default = "test,scenario", help = "Comma separated columns to group by, from " + ", ".join(groupColumns))
+    parser.add_argument("--format", choices = ["table", "csv", "json"], default = "table", help = "Output format")
+    args = parser.parse_args()
+
+    groupBy = [group for group in args.group.split(",") if group != '']
+    for group in groupBy:
+        if group not in groupColumns:
+            parser.error("--group can only contain " + ", ".join(groupColumns))
+    start = DateCodec.toOrdinal(args.start) if args.start != '' else None
+    if args.range > 0:
+        start = DateCodec.windowStart(args.range)
+
+    store, columns = refreshIndex(args.logs)
+    begin = time.perf_counter()
+    results = query(store, columns, args.scenario, args.tests.split(",") if args.tests != '' else None, args.machines.split(",") if args.machines != '' else None,
+        start, DateCodec.toOrdinal(args.end) if args.end != '' else None, args.first_version or None, args.last_version or None, groupBy)
+    elapsed = time.perf_counter() - begin
+    store.close()
+    writeResults(results, groupBy, args.format, sys.stdout)
+    print("{} groups in {:.1f} ms".format(len(results), elapsed * 1000), file=sys.stderr)
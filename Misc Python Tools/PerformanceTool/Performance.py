@@ -1,49 +1,143 @@
 import os
 import argparse
-from datetime import datetime
 import sys
+import BaselineStore
+import IngestionCursor
+import Instrumentation
+import LogParser
+import LogScanner
+import LogSync
+import MachinePool
+import PerfQuery
+import PerformanceStore
+import RowIndex
+import SafeFile
+import VersionIndex
 
-#Change a string representation of a duration into a float
-def time_to_sec(time):
-    if time == '':
-        return 0
-    else:
-        holder = time.strip().split(":")
-        if len(holder) == 1:
-            return float(holder[0])
-        hour = int(holder[0])
-        minute = int(holder[1])
-        sec = float(holder[2])
-        return hour * 3600 + minute * 60 + sec
+#get test name without prefix
+def removePrefix(testName):
+    if(len(testName.split('Perf_')) > 1):
+        return testName.split('Perf_')[1]
+    return testName
+
+#find logs in a machine's directory and check which have new data since the last run
+def scanMachine(path, cursors):
+    if not os.path.exists(path):
+        return None
+    logs = []
+    for tests in os.listdir(path):
+        #check if file is valid
+        if tests.endswith(".log"):
+            #get offset of the first unread line, None if there is nothing new
+            logPath = os.path.join(path, tests)
+            offset, rewritten = IngestionCursor.checkLog(logPath, cursors.get(logPath))
+            logs.append([logPath, tests, offset, rewritten])
+    return logs
+
+#map new lines and get updated cursors of a machine's logs, None for logs without new data
+def readMachine(logs, cursors):
+    newData = []
+    for logPath, tests, offset, rewritten in logs:
+        if offset is None:
+            newData.append(None)
+        elif offset == 0:
+            newData.append(LogScanner.mapLog(logPath, 0))
+        else:
+            newData.append(LogScanner.mapLog(logPath, offset, cursors[logPath]))
+    return newData
+
+#yield logs with new data in the same order as reading each machine one after another
+#each log is unmapped once it has been processed
+def newLogs(paths, scans, newData, skipped):
+    for index, (path, machine) in enumerate(paths):
+        if index not in skipped:
+            for logNumber, log in enumerate(scans[index]):
+                if newData[index][logNumber] is not None:
+                    block, cursor = newData[index][logNumber]
+                    newData[index][logNumber] = None
+                    yield log[0], log[1], machine, block, cursor
+                    if block is not None:
+                        block[0].close()
+
+#pass lines on while counting them in counter[0], so the lines counter can be added to once per log
+def countLines(records, counter):
+    for record in records:
+        counter[0] += 1
+        yield record
+
+#keep the baseline of the newest line of each scenario of a test and the machine it came from, and pass the lines on
+def trackBaselines(records, baselines, machine):
+    seen = set()
+    for date, scenario, time, baseTime in records:
+        #lines come newest first, so the first line of each scenario is the newest one the log has
+        BaselineStore.update(baselines, scenario, baseTime, date, machine, scenario not in seen)
+        seen.add(scenario)
+        yield date, scenario, time
+
+#format lines into rows of the output csv, encoded so they can be checked against the row index before being turned into text
+def formatRows(records, test, machine, version):
+    encoded = {}
+    testText = ("," + str(test) + ",").encode()
+    end = ("," + machine + "," + str(version) + "\n").encode()
+    for date, scenario, time in records:
+        if scenario not in encoded:
+            encoded[scenario] = scenario.encode()
+        if date not in encoded:
+            encoded[date] = date.encode()
+        yield b"%s%s%r,%s%s" % (encoded[scenario], testText, time, encoded[date], end)
+
+#skip rows that are already in the index, keys of the rows that are passed on are added to newKeys
+#rows are only checked against the file as it was before this log, matching what was read back from the csv
+def dedupe(rows, index, newKeys):
+    for row in rows:
+        key = RowIndex.rowKey(row)
+        if key not in index:
+            newKeys.append(key)
+            yield row
+
+#check if Performance.csv and every _performance.csv are unchanged since the last run
+#only then can new rows be appended to Performance.csv instead of combining every file again
+def combinedCurrent(path, testNames, combinedState):
+    if combinedState is None or SafeFile.fileStat(os.path.join(path, "Performance.csv")) != combinedState["stat"]:
+        return False
+    if sorted(set(testNames.values())) != sorted(combinedState["tests"]):
+        return False
+    for test in combinedState["tests"]:
+        if SafeFile.fileStat(os.path.join(path, test + "_performance.csv")) != combinedState["tests"][test]:
+            return False
+    return True
 
 #combine files to into main file
 def combine(path, testNames):
-    combined = open(path + "\\Performance.csv", 'w')
-    combined.write("Scenario,Test Name,Time (s),Date,Machine,Version\n")
+    combined = open(os.path.join(path, "Performance.csv"), 'w')
+    combined.write(PerformanceStore.header)
     for test in testNames.values():
-        base = open(defaultPath + "\\" + test + "_performance.csv", 'r')
+        base = open(os.path.join(path, test + "_performance.csv"), 'r')
         baseData = base.readlines()[1:]
         combined.writelines(baseData)
         base.close()
     combined.close()
 
 #declaring variables to be used
-scenario = {}
 testName = {}
-time = {}
-date = {}
-data = {}
-test = {}
-dateAll = []
-baselineData = {}
-dateBaseline = {}
+rowIndexes = {}
 
 #process command line arguments
 parser = argparse.ArgumentParser(description = "Collect Performance Data")
 parser.add_argument("--logs", default = '', help = "Location of performance logs and where files will be saved")
 parser.add_argument("--machines", default = '', help = "Location of Machines.txt file")
 parser.add_argument("--install", default = '', help = "Location of Disco Install directory")
+parser.add_argument("--full", action = "store_true", help = "Ignore saved ingestion state and reprocess every log")
+parser.add_argument("--workers", type = int, default = 1, help = "Number of machines to read from at the same time")
+parser.add_argument("--timeout", type = float, default = 600, help = "Seconds a machine may take in total to be scanned and read, or synced with --cache, before it is skipped")
+parser.add_argument("--store", action = "store_true", help = "Keep results in Performance.db and export Performance.csv from it")
+parser.add_argument("--cache", default = '', help = "Directory to mirror each machine's logs into before reading them locally")
+parser.add_argument("--query-index", action = "store_true", help = "Bring Performance.db and the query index up to date for PerfQuery after reading the logs")
+parser.add_argument("--max-bytes", type = int, default = 0, help = "Put off logs with new data once about this many new bytes are taken on, 0 reads everything")
+parser.add_argument("--profile", default = '', help = "Save cProfile stats and collapsed stacks of the run to this path with .pstats and .folded added")
 args = parser.parse_args()
+if args.profile != '':
+    Instrumentation.startProfile(args.profile)
 
 #checking if default file path is desired
 if len(sys.argv) == 1:
@@ -85,102 +179,244 @@ if len(sys.argv) == 1:
 else:
     version = args.install
 
-#go through each machine
+#load cursors and baselines saved by the last run so only new log lines need to be read
+#the saved baselines are kept even with --full so the history only records baselines that really changed
+savedState = IngestionCursor.loadState(defaultPath)
+baselineData = BaselineStore.loadBaselines(defaultPath)
+previousBaselines = BaselineStore.snapshot(baselineData)
+if args.full:
+    state = {"cursors": {}}
+    baselineData = {}
+else:
+    state = savedState
+versionIndex = VersionIndex.loadIndex(defaultPath)
+
+#get file path and name of each machine
+paths = []
 for tester in machines:
-    #format file path
-    pathList = tester.split("\n")[0].split("\\")
-    path = "\\\\" + pathList[2] + "\\" + pathList[3]
+    if tester.strip() != '':
+        paths.append(MachinePool.machinePath(tester))
+
+#every phase that reads from a machine takes from the same --timeout, so a slow machine is skipped after --timeout in total
+spent = [0.0] * len(paths)
+
+#copy new data from each machine into the local cache and read the logs from there
+#a machine that cannot be synced is still read from its cached logs
+syncSkipped = {}
+if args.cache != '':
+    Instrumentation.stage("sync")
+    syncs, syncSkipped = MachinePool.runTasks(LogSync.syncMachine, [[path, LogSync.machineCache(args.cache, machine)] for path, machine in paths], args.workers, args.timeout, spent)
+    for index, totals in enumerate(syncs):
+        if totals is None and index not in syncSkipped:
+            syncSkipped[index] = "path not found"
+        elif totals is not None:
+            for counter in totals:
+                Instrumentation.count(counter, totals[counter])
+    paths = [[LogSync.machineCache(args.cache, machine), machine] for path, machine in paths]
+
+    #only the sync reads from the machine, the cached logs are read locally with a --timeout of their own
+    spent = [0.0] * len(paths)
+
+#go through each machine and find logs that have changed since the last run
+Instrumentation.stage("scan")
+scans, skipped = MachinePool.runTasks(scanMachine, [[path, state["cursors"]] for path, machine in paths], args.workers, [args.timeout - seconds for seconds in spent], spent)
+resetTests = set()
+for index, (path, machine) in enumerate(paths):
     print(path)
+    if scans[index] is None:
+        scans[index] = []
+        if index not in skipped:
+            skipped[index] = "path not found"
+    Instrumentation.count("logs", len(scans[index]))
+    for logPath, tests, offset, rewritten in scans[index]:
+        #get the name of the file without prefix or affix
+        testName[tests] = tests.split(".")[0]
+
+        #a rewritten log may have had lines removed or renamed and a missing output file has to be rebuilt
+        if rewritten or not os.path.exists(os.path.join(defaultPath, testName[tests] + "_performance.csv")):
+            resetTests.add(testName[tests])
+
+#every log of a reset test is read from the start and its baselines are recalculated
+for index in range(len(paths)):
+    for log in scans[index]:
+        if testName[log[1]] in resetTests:
+            log[2] = 0
+for test in resetTests:
+    if removePrefix(test) in baselineData:
+        baselineData[removePrefix(test)] = {}
+
+#with --max-bytes, logs that would take the new data of this run past the limit keep their cursors and are read on a later run
+#the first log with new data is always read so every run makes progress
+#a reset test is read again from the start, so only its logs that have never been read can be put off
+deferred = 0
+if args.max_bytes > 0:
+    taken = 0
+    for index in range(len(paths)):
+        for log in scans[index]:
+            if log[2] is None:
+                continue
+            newBytes = os.path.getsize(log[0]) - log[2]
+            if taken == 0 or taken + newBytes <= args.max_bytes or (testName[log[1]] in resetTests and log[0] in state["cursors"]):
+                taken += newBytes
+            else:
+                log[2] = None
+                deferred += 1
+
+    #a new test whose logs were all put off still gets its output file so every test can be combined
+    for test in set(testName.values()):
+        csvPath = os.path.join(defaultPath, test + "_performance.csv")
+        if not os.path.exists(csvPath):
+            with open(csvPath, "w") as output:
+                output.write(PerformanceStore.header)
+Instrumentation.count("deferred logs", deferred)
 
-    #get the name of the machine running the program
-    machine = pathList[2]
-
-    #scan through every file in directory
-    if os.path.exists(path):
-        for tests in os.listdir(path):
-            #check if file is valid
-            if tests.endswith(".log"):
-                #get the name of the file without prefix or affix
-                testName[tests] = tests.split(".")[0]
-
-                #opening input and output files
-                fileData = open(path + "\\" + tests, "r")
-
-                #getting all lines from log files and sorting to get newest first
-                logLines = fileData.readlines()
-                logLines.reverse()
-
-                #creating variable to store preexisting file lines
-                lines = []
-                
-                #check if output files already exist
-                if os.path.exists(defaultPath + "\\" + testName[tests] + "_performance.csv"):
-                    #loads data from file to use for checking
-                    output = open(defaultPath + "\\" + testName[tests] + "_performance.csv", "r")
-                    lines = output.readlines()
-                    output.close()
-
-                    #open file to append data
-                    output = open(defaultPath + "\\" + testName[tests] + "_performance.csv", "a")
-                else:
-                    #create new output file
-                    output = open(defaultPath + "\\" + testName[tests] + "_performance.csv", "w")
-
-                    #creating header
-                    output.write("Scenario,Test Name,Time (s),Date,Machine,Version\n")
-
-                #get test name without prefix
-                if(len(testName[tests].split('Perf_')) > 1):
-                    testNameNoPerf = testName[tests].split('Perf_')[1]
-                else:
-                    testNameNoPerf = testName[tests]
-                if testNameNoPerf not in baselineData:
-                    baselineData[testNameNoPerf] = {}
-                    dateBaseline[testNameNoPerf] = {}
-
-                #scan and format data and add to output file
-                for line in logLines:
-                    data[line] = line
-                    splitData = data[line].split(", ", 3)
-                    date[line] = splitData[0].split(" ")[0]
-                    scenario[line] = splitData[1]
-                    time[line] = time_to_sec(splitData[3].split(", ")[0])
-                    baseline = splitData[2].split(':')
-                    baseTime = int(baseline[0]) * 3600 + int(baseline[1]) * 60 + float(baseline[2])
-                    if scenario[line] not in baselineData[testNameNoPerf].keys():
-                        baselineData[testNameNoPerf][scenario[line]] = baseTime
-                        dateBaseline[testNameNoPerf][scenario[line]] = date[line]
-                    elif baselineData[testNameNoPerf][scenario[line]] != baseTime:
-                        basedate = datetime.strptime(dateBaseline[testNameNoPerf][scenario[line]], "%m/%d/%Y")
-                        newdate = datetime.strptime(date[line], "%m/%d/%Y")
-                        if basedate < newdate:
-                            baselineData[testNameNoPerf][scenario[line]] = baseTime
-                            dateBaseline[testNameNoPerf][scenario[line]] = date[line]
-
-                    #line of data to be printed onto file
-                    outputLine = str(scenario[line]) + "," + str(testName[tests]) + "," + str(time[line]) + "," + str(date[line]) + "," + machine + "," + str(version) + "\n"
-
-                    #if data already exists, it is skipped
-                    if outputLine not in lines:
-                        #print data into csv format
-                        output.write(outputLine)
-
-                #close all files
-                fileData.close()
-                output.close()
+#read new lines from each machine
+Instrumentation.stage("read")
+newData, readSkipped = MachinePool.runTasks(readMachine, [[scans[index], state["cursors"]] for index in range(len(paths))], args.workers, [args.timeout - seconds for seconds in spent], spent)
+skipped.update(readSkipped)
+for index in range(len(paths)):
+    if index not in skipped:
+        for log, logData in zip(scans[index], newData[index]):
+            if logData is not None and logData[0] is not None:
+                Instrumentation.count("files")
+                Instrumentation.count("bytes", logData[0][2] - logData[0][1])
+
+#logs of a reset test on a skipped machine have to be read from the start on the next run
+for index in skipped:
+    for logPath in list(state["cursors"]):
+        if logPath.startswith(os.path.join(paths[index][0], "")) and logPath[len(paths[index][0]) + 1:].split(".")[0] in resetTests:
+            del state["cursors"][logPath]
+
+#new rows are appended to Performance.csv while the _performance.csv files are written
+#if any file changed outside of this tool since the last run, Performance.csv is combined again at the end
+if not args.store and combinedCurrent(defaultPath, testName, state.get("combined")):
+    combined = open(os.path.join(defaultPath, "Performance.csv"), 'a')
+else:
+    combined = None
+
+#go through each log with new data
+Instrumentation.stage("parse and write")
+for logPath, tests, machine, block, cursor in newLogs(paths, scans, newData, skipped):
+    #check if output files already exist
+    csvPath = os.path.join(defaultPath, testName[tests] + "_performance.csv")
+    versionScenarios = VersionIndex.testScenarios(versionIndex, testName[tests], csvPath)
+    if os.path.exists(csvPath):
+        #loads hashes of existing rows to use for checking
+        if testName[tests] not in rowIndexes:
+            rowIndexes[testName[tests]] = RowIndex.loadIndex(csvPath)
+
+        #open file to append data
+        output = open(csvPath, "a")
+    else:
+        #create new output file
+        output = open(csvPath, "w")
+
+        #creating header
+        output.write(PerformanceStore.header)
+        rowIndexes[testName[tests]] = {RowIndex.rowKey(PerformanceStore.header)}
+    newKeys = []
+    newRows = []
+
+    #get test name without prefix
+    testNameNoPerf = removePrefix(testName[tests])
+    if testNameNoPerf not in baselineData:
+        baselineData[testNameNoPerf] = {}
+
+    #parse each line newest first, update baselines, and write rows that are not already in the output file
+    if block is not None:
+        malformed = []
+        lineCount = [0]
+        records = trackBaselines(countLines(LogScanner.scanLog(block, malformed), lineCount), baselineData[testNameNoPerf], machine)
+        for row in dedupe(formatRows(records, testName[tests], machine, version), rowIndexes[testName[tests]], newKeys):
+            outputLine = row.decode()
+            output.write(outputLine)
+            newRows.append(outputLine)
+            if combined is not None:
+                combined.write(outputLine)
+
+        #malformed lines are skipped and copied to the quarantine file so one bad line does not stop the collection
+        if len(malformed) > 0:
+            print("Quarantined " + str(len(malformed)) + " malformed lines of " + logPath)
+            LogParser.quarantine(defaultPath, logPath, malformed)
+        Instrumentation.count("lines", lineCount[0] + len(malformed))
+        Instrumentation.count("malformed", len(malformed))
+
+    #close all files
+    output.close()
+    VersionIndex.addRows(versionScenarios, newRows)
+    VersionIndex.synced(versionIndex, testName[tests], csvPath)
+    rowIndexes[testName[tests]].update(newKeys)
+    Instrumentation.count("rows", len(newKeys))
+    state["cursors"][logPath] = cursor
 
 #combine files
-combine(defaultPath, testName)
+if args.store:
+    Instrumentation.stage("store")
+
+    #add new rows to the database and export Performance.csv from it
+    store = PerformanceStore.openStore(defaultPath)
+    for test in testName.values():
+        PerformanceStore.syncTest(store, os.path.join(defaultPath, test + "_performance.csv"), test)
+    PerformanceStore.exportCsv(store, os.path.join(defaultPath, "Performance.csv"), testName.values())
+    store.close()
+elif combined is not None:
+    combined.close()
+else:
+    Instrumentation.stage("combine")
+    combine(defaultPath, testName)
 
 #removing scenario from Perf_MultiSim that has been renamed
+Instrumentation.stage("save")
 if "MultiSim" in baselineData.keys():
     if "Solve Structural Analyze" in baselineData["MultiSim"].keys():
         del baselineData["MultiSim"]["Solve Structural Analyze"]
 
-#create spreadsheet with Baseline Data
-csv = open(defaultPath + "\\Baseline Data.csv", 'w')
-csv.write("Scenario,Test Name,Time (s)\n")
-for test in baselineData.keys():
-    for scenario in baselineData[test].keys():
-        csv.write(scenario + ',' + test + ',' + str(baselineData[test][scenario]) + '\n')
-csv.close()
\ No newline at end of file
+#record every baseline that changed and only rewrite the spreadsheet with Baseline Data when one did
+baselineChanges = BaselineStore.changes(previousBaselines, baselineData)
+BaselineStore.appendHistory(defaultPath, baselineChanges)
+Instrumentation.count("baseline changes", len(baselineChanges))
+if len(baselineChanges) > 0 or not os.path.exists(os.path.join(defaultPath, "Baseline Data.csv")):
+    BaselineStore.writeCsv(defaultPath, baselineData)
+
+#save row indexes, baselines and cursors for the next run
+for test in rowIndexes:
+    RowIndex.saveIndex(os.path.join(defaultPath, test + "_performance.csv"), rowIndexes[test])
+BaselineStore.saveBaselines(defaultPath, baselineData)
+
+#version aggregates of tests whose _performance.csv was changed outside of this tool are rebuilt before saving
+for test in set(testName.values()):
+    VersionIndex.testScenarios(versionIndex, test, os.path.join(defaultPath, test + "_performance.csv"))
+VersionIndex.saveIndex(defaultPath, versionIndex)
+#size and modified time of every combined file, to check that rows can be appended on the next run
+if args.store:
+    state.pop("combined", None)
+else:
+    state["combined"] = {"stat": SafeFile.fileStat(os.path.join(defaultPath, "Performance.csv")), "tests": {}}
+    for test in set(testName.values()):
+        state["combined"]["tests"][test] = SafeFile.fileStat(os.path.join(defaultPath, test + "_performance.csv"))
+state["deferred"] = deferred
+IngestionCursor.saveState(defaultPath, state)
+
+#bring Performance.db and the query index up to date for PerfQuery, which otherwise does it before its first query
+#the results are already saved, so a failure here is reported without failing the run
+if args.query_index:
+    Instrumentation.stage("query index")
+    try:
+        store, columns = PerfQuery.refreshIndex(defaultPath)
+        store.close()
+    except Exception as e:
+        print("Could not update the query index: " + str(e))
+Instrumentation.finish()
+Instrumentation.stopProfile()
+
+#print summary of logs left for the next run and machines that could not be read
+if deferred > 0:
+    print("Logs put off until the next run: " + str(deferred))
+if len(skipped) > 0:
+    print("Skipped machines:")
+    for index in sorted(skipped):
+        print(paths[index][1] + ": " + skipped[index])
+if len(syncSkipped) > 0:
+    print("Machines read from cached logs without syncing:")
+    for index in sorted(syncSkipped):
+        print(paths[index][1] + ": " + syncSkipped[index])
\ No newline at end of file
@@ -0,0 +1,246 @@
+import os
+import sqlite3
+import sys
+import DateCodec
+import IngestionCursor
+
+# name of the database saved next to Performance.csv
+storeFileName = "Performance.db"
+header = "Scenario,Test Name,Time (s),Date,Machine,Version\n"
+
+# text columns are stored once in their own table and referenced by id
+# dates are stored as ordinals for range scans and as an id of the original text for exporting
+schema = """
+CREATE TABLE IF NOT EXISTS scenarios (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS tests (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS machines (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS versions (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS dates (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS results (scenario INTEGER, test INTEGER, time REAL, date INTEGER, dateText INTEGER, machine INTEGER, version INTEGER);
+CREATE INDEX IF NOT EXISTS results_date ON results (date);
+CREATE INDEX IF NOT EXISTS results_scenario ON results (scenario, date);
+CREATE INDEX IF NOT EXISTS results_machine ON results (machine, date);
+CREATE INDEX IF NOT EXISTS results_test ON results (test);
+CREATE TABLE IF NOT EXISTS sources (test TEXT PRIMARY KEY, size INTEGER, mtime REAL, offset INTEGER, lastLine INTEGER, hash TEXT);
+CREATE TABLE IF NOT EXISTS exports (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER);
+"""
+columns = ["scenarios", "tests", "machines", "versions", "dates"]
+
+# connection to the database that keeps a cache of the name of every id for each text column
+class Store(sqlite3.Connection):
+    pass
+
+# opens the database in a directory, creating it if it does not exist
+def openStore(path):
+    store = sqlite3.connect(os.path.join(path, storeFileName), factory=Store)
+    store.executescript(schema)
+    store.ids = {}
+    store.names = {}
+    for column in columns:
+        store.ids[column] = {}
+        store.names[column] = {}
+        for id, name in store.execute("SELECT id, name FROM " + column):
+            store.ids[column][name] = id
+            store.names[column][id] = name
+    return store
+
+# returns id of a value of a text column, adding it if it is new
+def getId(store, column, name):
+    if name not in store.ids[column]:
+        id = store.execute("INSERT INTO " + column + " (name) VALUES (?)", (name,)).lastrowid
+        store.ids[column][name] = id
+        store.names[column][id] = name
+    return store.ids[column][name]
+
+# removes every row of a test and counts the removal in the database's user_version
+# rows are otherwise only ever appended, so readers that copy the rows can tell when they have to start over
+def removeTest(store, testName):
+    if testName in store.ids["tests"]:
+        store.execute("DELETE FROM results WHERE test = ?", (store.ids["tests"][testName],))
+        store.execute("PRAGMA user_version = " + str(removals(store) + 1))
+
+# returns the number of times rows have been removed from the database
+def removals(store):
+    return store.execute("PRAGMA user_version").fetchone()[0]
+
+# adds lines from a _performance.csv file to the database
+# ids of names that are already known are looked up directly, getId is only called for new names
+# scenarios can contain commas but the other columns cannot, so rows are split from the end
+def addRows(store, lines):
+    rows = []
+    scenarios, tests, dates, machines, versions = [store.ids[column] for column in ["scenarios", "tests", "dates", "machines", "versions"]]
+    for line in lines:
+        lineData = line.rstrip("\n").rsplit(",", 5)
+        if len(lineData) < 6 or line == header:
+            continue
+        scenario, test, time, date, machine, version = lineData
+        rows.append((scenarios[scenario] if scenario in scenarios else getId(store, "scenarios", scenario),
+            tests[test] if test in tests else getId(store, "tests", test), float(time), DateCodec.toOrdinal(date),
+            dates[date] if date in dates else getId(store, "dates", date), machines[machine] if machine in machines else getId(store, "machines", machine),
+            versions[version] if version in versions else getId(store, "versions", version)))
+    store.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+# brings the rows of a test up to date with its _performance.csv file
+# only rows appended since the last sync are added, a rewritten file replaces all rows of the test
+def syncTest(store, csvPath, testName):
+    saved = store.execute("SELECT size, mtime, offset, lastLine, hash FROM sources WHERE test = ?", (testName,)).fetchone()
+    cursor = None
+    if saved is not None:
+        cursor = {"size": saved[0], "mtime": saved[1], "offset": saved[2], "lastLine": saved[3], "hash": saved[4]}
+    offset, rewritten = IngestionCursor.checkLog(csvPath, cursor)
+    if offset is None:
+        return
+    if offset == 0:
+        removeTest(store, testName)
+        lines, cursor = IngestionCursor.readLog(csvPath, 0)
+    else:
+        lines, cursor = IngestionCursor.readLog(csvPath, offset, cursor)
+    addRows(store, lines)
+    store.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)",
+        (testName, cursor["size"], cursor["mtime"], cursor["offset"], cursor["lastLine"], cursor["hash"]))
+    store.commit()
+
+# opens the database in a directory and brings it up to date with every _performance.csv in the directory
+# only rows appended since the last sync are read, and rows of tests whose _performance.csv was deleted are removed
+# the indexes of an empty database are created after its first sync, which is much faster than updating them with every row
+def refreshStore(path):
+    store = openStore(path)
+    empty = store.execute("SELECT 1 FROM results LIMIT 1").fetchone() is None
+    if empty:
+        for (index,) in store.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'results'").fetchall():
+            store.execute("DROP INDEX " + index)
+    csvTests = [name[:-len("_performance.csv")] for name in os.listdir(path) if name.endswith("_performance.csv")]
+    for test in sorted(csvTests):
+        syncTest(store, os.path.join(path, test + "_performance.csv"), test)
+    if empty:
+        store.executescript(schema)
+    for (test,) in store.execute("SELECT test FROM sources").fetchall():
+        if test not in csvTests:
+            removeTest(store, test)
+            store.execute("DELETE FROM sources WHERE test = ?", (test,))
+    store.commit()
+    return store
+
+# writes every row to a csv in the same format as Performance.csv
+# rows of the tests in testNames are written first in that order, followed by any other tests in the database
+def exportCsv(store, csvPath, testNames=[]):
+    order = []
+    for test in testNames:
+        if test in store.ids["tests"] and store.ids["tests"][test] not in order:
+            order.append(store.ids["tests"][test])
+    for id in sorted(store.names["tests"]):
+        if id not in order:
+            order.append(id)
+
+    names = store.names
+    with open(csvPath, 'w') as f:
+        f.write(header)
+        for test in order:
+            for scenario, time, dateText, machine, version in store.execute(
+                    "SELECT scenario, time, dateText, machine, version FROM results WHERE test = ? ORDER BY rowid", (test,)):
+                f.write(names["scenarios"][scenario] + "," + names["tests"][test] + "," + str(time) + "," + names["dates"][dateText] + ","
+                    + names["machines"][machine] + "," + names["versions"][version] + "\n")
+
+    # remember which Performance.csv the database matches so readers know the database is up to date
+    stat = os.stat(csvPath)
+    store.execute("INSERT OR REPLACE INTO exports VALUES (?, ?, ?)", (os.path.abspath(csvPath), stat.st_size, stat.st_mtime_ns))
+    store.commit()
+
+# returns an open database for a directory if it matches the Performance.csv in that directory, otherwise None
+def openCurrentStore(path):
+    csvPath = os.path.join(path, "Performance.csv")
+    if not os.path.exists(os.path.join(path, storeFileName)):
+        return None
+    store = openStore(path)
+    if os.path.exists(csvPath):
+        stat = os.stat(csvPath)
+        exported = store.execute("SELECT size, mtime FROM exports WHERE path = ?", (os.path.abspath(csvPath),)).fetchone()
+        if exported != (stat.st_size, stat.st_mtime_ns):
+            store.close()
+            return None
+    return store
+
+# returns rows of performance data as (scenario, test name, time, date ordinal, date, machine, version)
+# rows can be restricted to a list of scenarios and machines and a range of date ordinals
+# rows are read from Performance.db when it is up to date, otherwise from Performance.csv
+def readRows(path, scenarios=None, machines=None, start=None, end=None):
+    store = openCurrentStore(path)
+    if store is None:
+        return readCsvRows(path, scenarios, machines, start, end)
+    return readStoreRows(store, scenarios, machines, start, end)
+
+def readStoreRows(store, scenarios, machines, start, end):
+    names = store.names
+    query = "SELECT scenario, test, time, date, dateText, machine, version FROM results WHERE 1"
+    parameters = []
+    for column, values in [["scenario", scenarios], ["machine", machines]]:
+        if values is not None:
+            ids = [store.ids[column + "s"][value] for value in values if value in store.ids[column + "s"]]
+            query += " AND " + column + " IN (" + ",".join("?" * len(ids)) + ")"
+            parameters += ids
+    if start is not None:
+        query += " AND date >= ?"
+        parameters.append(start)
+    if end is not None:
+        query += " AND date <= ?"
+        parameters.append(end)
+    try:
+        for scenario, test, time, date, dateText, machine, version in store.execute(query + " ORDER BY rowid", parameters):
+            yield (names["scenarios"][scenario], names["tests"][test], time, date, names["dates"][dateText], names["machines"][machine], names["versions"][version])
+    finally:
+        store.close()
+
+def readCsvRows(path, scenarios, machines, start, end):
+    with open(os.path.join(path, "Performance.csv"), 'r') as f:
+        f.readline()
+        for line in f:
+            lineData = line.strip().rsplit(",", 5)
+            if scenarios is not None and lineData[0] not in scenarios:
+                continue
+            if machines is not None and lineData[4] not in machines:
+                continue
+            date = DateCodec.toOrdinal(lineData[3])
+            if (start is not None and date < start) or (end is not None and date > end):
+                continue
+            yield (lineData[0], lineData[1], float(lineData[2].strip()), date, lineData[3], lineData[4], lineData[5])
+
+# checks that rows read back from the database and from Performance.csv match the _performance.csv files they came from,
+# including a scenario with a comma in its name, after a first sync, an appended row and a rewritten file
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+
+    tests = {
+        "Perf_Base": ["Perf_Base Open,Close,Perf_Base,25.5,01/02/2023,MACHINE1,23.2\n", "Perf_Base Open,Perf_Base,30.0,01/03/2023,MACHINE1,23.2\n"],
+        "Perf_Other": ["Perf_Other Solve,Perf_Other,12.25,01/02/2023,MACHINE2,23.2\n"]
+        }
+    path = tempfile.mkdtemp()
+    failures = 0
+    try:
+        for step in ["sync", "append", "rewrite"]:
+            if step == "append":
+                tests["Perf_Other"].append("Perf_Other Solve,Again,Perf_Other,13.5,01/04/2023,MACHINE2,23.3\n")
+            if step == "rewrite":
+                tests["Perf_Base"] = tests["Perf_Base"][:1]
+            for test, lines in tests.items():
+                with open(os.path.join(path, test + "_performance.csv"), 'w') as f:
+                    f.write(header)
+                    f.writelines(lines)
+            store = refreshStore(path)
+            exportCsv(store, os.path.join(path, "Performance.csv"), list(tests))
+            store.close()
+
+            expected = []
+            for lines in tests.values():
+                for line in lines:
+                    lineData = line.rstrip("\n").rsplit(",", 5)
+                    expected.append((lineData[0], lineData[1], float(lineData[2]), DateCodec.toOrdinal(lineData[3]), lineData[3], lineData[4], lineData[5]))
+            # a rewritten test's rows are added again after the other tests, so rows are compared in any order
+            for source, rows in [["Performance.db", list(readRows(path))], ["Performance.csv", list(readCsvRows(path, None, None, None, None))]]:
+                if sorted(rows) != sorted(expected):
+                    failures += 1
+                    print("FAIL " + step + ": rows from " + source + " were " + repr(rows))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    print("Store check " + ("passed" if failures == 0 else "failed"))
+    sys.exit(1 if failures > 0 else 0)
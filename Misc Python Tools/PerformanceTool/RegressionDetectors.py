@@ -0,0 +1,221 @@
+import math
+import numpy
+import DateCodec
+
+# fewest days on each side of a change point
+minimumSegment = 3
+
+# smallest increase in percent that is reported as a regression by the change-point detectors
+minimumChange = 5
+
+# confidence a change-point detector needs before it reports a regression
+minimumConfidence = 0.95
+
+# returns the daily series of every scenario in results, which is results[testName][scenario][date] = time
+# series["times"] has a row for each of series["keys"], which are (testName, scenario), with the times of each day oldest first
+# rows are padded with NaN after their last day, series["counts"] is the number of days in each row
+# and series["dates"] are the dates of each row
+def buildSeries(results):
+    keys = []
+    dates = []
+    for testName in results:
+        for scenario in results[testName]:
+            keys.append((testName, scenario))
+            dates.append(sorted(results[testName][scenario], key=DateCodec.toOrdinal))
+    counts = numpy.array([len(scenarioDates) for scenarioDates in dates], dtype=numpy.int64)
+    times = numpy.full((len(keys), counts.max() if len(keys) > 0 else 0), numpy.nan)
+    for row, (testName, scenario) in enumerate(keys):
+        times[row, :counts[row]] = [results[testName][scenario][date] for date in dates[row]]
+    return {"keys": keys, "dates": dates, "times": times, "counts": counts}
+
+# returns the probability of a standard normal value being higher than each of z
+def upperTail(z):
+    return 0.5 * numpy.frompyfunc(math.erfc, 1, 1)(numpy.asarray(z, dtype=numpy.float64) / math.sqrt(2)).astype(numpy.float64)
+
+# finds the day each series is most likely to have become slower and the times before and after it
+# the split is where the CUSUM of differences from the series' mean is lowest, which is the start of the largest increase in the mean
+# series with fewer than 2 * minimumSegment days have a split of -1
+# the results are saved in series so every change-point detector uses the same split
+def changePoints(series):
+    if "split" in series:
+        return series
+    times = series["times"]
+    counts = series["counts"]
+    columns = numpy.arange(times.shape[1])
+    valid = columns < counts[:, None]
+    means = numpy.nansum(times, axis=1) / numpy.maximum(counts, 1)
+    cusum = numpy.cumsum(numpy.where(valid, times - means[:, None], 0), axis=1)
+
+    # cusum[:, k - 1] is the sum of the first k differences, so a split at k leaves k days before it
+    splits = columns + 1
+    allowed = (splits >= minimumSegment) & (splits <= counts[:, None] - minimumSegment)
+    lowest = numpy.argmin(numpy.where(allowed, cusum, numpy.inf), axis=1) if times.shape[1] > 0 else numpy.zeros(0, dtype=numpy.int64)
+    found = allowed.any(axis=1) if times.shape[1] > 0 else numpy.zeros(0, dtype=bool)
+    split = numpy.where(found, lowest + 1, -1)
+
+    before = valid & (columns < split[:, None])
+    after = valid & (columns >= split[:, None]) & found[:, None]
+    series["split"] = split
+    series["before"] = before
+    series["after"] = after
+    series["cusum"] = numpy.where(found, cusum[numpy.arange(len(split)), numpy.maximum(lowest, 0)], 0)
+    return series
+
+# returns the mean and sum of squared differences from it of the times in mask of each row
+def maskedMoments(times, mask):
+    count = numpy.maximum(mask.sum(axis=1), 1)
+    means = numpy.where(mask, times, 0).sum(axis=1) / count
+    squares = numpy.where(mask, (times - means[:, None]) ** 2, 0).sum(axis=1)
+    return means, squares
+
+# returns the median of the times in mask of each row, NaN for rows without any
+def maskedMedians(times, mask):
+    medians = numpy.full(len(times), numpy.nan)
+    rows = mask.any(axis=1)
+    if rows.any():
+        medians[rows] = numpy.nanmedian(numpy.where(mask[rows], times[rows], numpy.nan), axis=1)
+    return medians
+
+# returns findings for the rows where increase is at least minimumChange and confidence at least minimumConfidence
+def changeFindings(series, name, increase, confidence):
+    findings = {}
+    flagged = (series["split"] >= 0) & (increase >= minimumChange) & (confidence >= minimumConfidence)
+    for row in numpy.flatnonzero(flagged):
+        findings[series["keys"][row]] = {"detector": name, "start": series["dates"][row][series["split"][row]],
+            "magnitude": float(increase[row]), "confidence": float(confidence[row])}
+    return findings
+
+# the original rule of the report: the latest time is at least 105% of the test baseline and above the historical baseline
+# scenarios without baselines are compared to 600 seconds, and only scenarios with at least 3 days of data are reported
+def threshold(series, context):
+    findings = {}
+    for row, (testName, scenario) in enumerate(series["keys"]):
+        if scenario in context["historicalBaselines"]:
+            baseline = context["baselines"][scenario]
+            historicalBaseline = context["historicalBaselines"][scenario]
+        else:
+            baseline = 600
+            historicalBaseline = 600
+        latest = context["latest"][scenario]
+        if (context["lastDate"][scenario] >= DateCodec.windowStart(context["reportRange"]) and latest >= baseline * 1.05
+                and latest > historicalBaseline and series["counts"][row] >= 3):
+            findings[(testName, scenario)] = {"detector": "threshold", "start": DateCodec.toDate(context["lastDate"][scenario]),
+                "magnitude": (latest - baseline) / baseline * 100, "confidence": 1.0}
+    return findings
+
+# reports an increase in the mean at the change point
+# confidence is from the largest deviation of a Brownian bridge, using the spread of the times within each side of the split
+def cusum(series, context):
+    changePoints(series)
+    times = series["times"]
+    beforeMeans, beforeSquares = maskedMoments(times, series["before"])
+    afterMeans, afterSquares = maskedMoments(times, series["after"])
+    deviation = numpy.sqrt((beforeSquares + afterSquares) / numpy.maximum(series["counts"] - 2, 1))
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        z = -series["cusum"] / (deviation * numpy.sqrt(series["counts"]))
+        z = numpy.where(deviation > 0, z, numpy.where(series["cusum"] < 0, numpy.inf, 0))
+        increase = (afterMeans - beforeMeans) / beforeMeans * 100
+    confidence = 1 - numpy.exp(-2 * numpy.maximum(z, 0) ** 2)
+    return changeFindings(series, "cusum", increase, confidence)
+
+# reports times after the change point that rank above the times before it, using the normal approximation of the
+# Mann-Whitney U test without a correction for ties, with the increase in the median as the magnitude
+def mannWhitney(series, context):
+    changePoints(series)
+    times = series["times"]
+    before = series["before"]
+    after = series["after"]
+    ranks = numpy.argsort(numpy.argsort(numpy.where(numpy.isnan(times), numpy.inf, times), axis=1, kind="stable"), axis=1) + 1
+    beforeCount = before.sum(axis=1)
+    afterCount = after.sum(axis=1)
+    u = numpy.where(after, ranks, 0).sum(axis=1) - afterCount * (afterCount + 1) / 2
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        z = (u - beforeCount * afterCount / 2) / numpy.sqrt(beforeCount * afterCount * (series["counts"] + 1) / 12)
+        beforeMedians = maskedMedians(times, before)
+        increase = (maskedMedians(times, after) - beforeMedians) / beforeMedians * 100
+    confidence = 1 - upperTail(numpy.nan_to_num(z))
+    return changeFindings(series, "mannwhitney", increase, confidence)
+
+# reports an increase in the median at the change point
+# confidence is from a sign test of how many days after the change point are above the median before it
+def medianShift(series, context):
+    changePoints(series)
+    times = series["times"]
+    after = series["after"]
+    beforeMedians = maskedMedians(times, series["before"])
+    afterCount = after.sum(axis=1)
+    above = (after & (times > beforeMedians[:, None])).sum(axis=1)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        z = (above - 0.5 - afterCount / 2) / numpy.sqrt(afterCount / 4)
+        increase = (maskedMedians(times, after) - beforeMedians) / beforeMedians * 100
+    confidence = 1 - upperTail(numpy.nan_to_num(z))
+    return changeFindings(series, "median", increase, confidence)
+
+# detectors that can be chosen for the report by name, each takes the series from buildSeries and a context of
+# baselines, historicalBaselines, latest, lastDate and reportRange, and returns a finding for each regressed (testName, scenario)
+# a finding is a dictionary of the detector's name, the date the regression started, its increase in percent and a confidence from 0 to 1
+detectors = {
+    "threshold": threshold,
+    "cusum": cusum,
+    "mannwhitney": mannWhitney,
+    "median": medianShift
+    }
+
+# returns dictionary of the findings of each (testName, scenario) that at least one of the named detectors reported
+def detect(results, names, context):
+    series = buildSeries(results)
+    findings = {}
+    for name in names:
+        for key, finding in detectors[name](series, context).items():
+            if key not in findings:
+                findings[key] = []
+            findings[key].append(finding)
+    return findings
+
+# times every detector on a synthetic set of scenarios, some of which get slower partway through the window,
+# and checks how many of the slowed scenarios each detector found and on which day
+if __name__ == "__main__":
+    import random
+    import time
+
+    scenarioCount = 5000
+    days = 60
+    generator = random.Random(0)
+    firstDay = DateCodec.today() - days + 1
+    results = {"Synthetic": {}}
+    starts = {}
+    latest = {}
+    lastDate = {}
+    baselines = {}
+    for number in range(scenarioCount):
+        scenario = "Scenario " + str(number)
+        baseline = generator.uniform(5, 300)
+        start = firstDay + generator.randrange(minimumSegment, days - minimumSegment) if number % 10 == 0 else None
+        results["Synthetic"][scenario] = {}
+        for day in range(firstDay, firstDay + days):
+            dayTime = baseline * generator.gauss(1, 0.02)
+            if start is not None and day >= start:
+                dayTime *= 1.2
+            results["Synthetic"][scenario][DateCodec.toDate(day)] = dayTime
+        if start is not None:
+            starts[("Synthetic", scenario)] = DateCodec.toDate(start)
+        latest[scenario] = dayTime
+        lastDate[scenario] = firstDay + days - 1
+        baselines[scenario] = baseline
+    context = {"baselines": baselines, "historicalBaselines": {scenario: baselines[scenario] * 1.1 for scenario in baselines},
+        "latest": latest, "lastDate": lastDate, "reportRange": days}
+
+    failures = 0
+    for name in detectors:
+        begin = time.perf_counter()
+        findings = detect(results, [name], context)
+        seconds = time.perf_counter() - begin
+        found = sum(1 for key in starts if key in findings)
+        onStart = sum(1 for key in starts if key in findings and findings[key][0]["start"] == starts[key])
+        falseAlarms = sum(1 for key in findings if key not in starts)
+        print("{}: {:.3f} s, found {} of {} regressions, {} on the day they started, {} false alarms".format(
+            name, seconds, found, len(starts), onStart, falseAlarms))
+        if name != "threshold" and (found < len(starts) * 0.95 or falseAlarms > scenarioCount * 0.01):
+            failures += 1
+    if failures > 0:
+        raise SystemExit(1)
@@ -1,5 +1,11 @@
+import argparse
 import os
 import sys
+from datetime import datetime
+import DateCodec
+import IngestionCursor
+import LogParser
+import LogSync
 
 machines = [
     "CHQW10REG03",
@@ -10,6 +16,11 @@ machines = [
     "CHQ2DISCOTEST04"
     ]
 
+parser = argparse.ArgumentParser(description = "Remove old results of a scenario from the performance logs")
+parser.add_argument("--cache", default = '', help = "Directory to mirror each machine's logs into and search them in")
+parser.add_argument("--logs", default = '', help = "Location of the files saved by Performance.py, so the changed logs are read again from the start on its next run")
+args = parser.parse_args()
+
 # check if the number entered is an int
 def isAnInt(number):
     try:
@@ -37,7 +48,9 @@ if date.count("/") == 2:
     day = int(day)
     month = int(month)
     year = int(year)
-    if month > 12 or day > 31:
+    try:
+        cutoff = datetime(year, month, day).toordinal()
+    except ValueError:
         print("Date entered is not valid")
         sys.exit(1)
 else:
@@ -47,12 +60,19 @@ else:
 # iterate through list of machines
 for machine in machines:
     perfPath = "\\\\{}\\PerformanceLogging".format(machine)
+
+    # search the local cache after copying new data into it if --cache is set, changed logs are still written to the machine
+    readPath = perfPath
+    if args.cache != '':
+        readPath = LogSync.machineCache(args.cache, machine)
+        LogSync.syncMachine(perfPath, readPath)
+
     # get all .log files
-    files = os.listdir(perfPath)
+    files = os.listdir(readPath)
     logs = []
     for f in files:
         if f.endswith(".log"):
-            logs.append(perfPath + "\\" + f)
+            logs.append(readPath + "\\" + f)
 
     # find .log file containing the tag
     found = False
@@ -63,8 +83,8 @@ for machine in machines:
         with open(log, 'r') as file:
             lines = file.readlines()
             for line in lines:
-                categories = line.split(", ")
-                if categories[1].lower() == tag:
+                fields = LogParser.parseLine(line)
+                if fields is not None and fields[1].lower() == tag:
                     found = True
                     tagFile = log
                     print(tagFile)
@@ -73,33 +93,30 @@ for machine in machines:
         print("{}: Tag not found".format(machine))
         continue
 
-    # load file into a list and remove unwanted lines
+    # load file into a list and remove unwanted lines, malformed lines are kept as they are
     lines = []
     with open(tagFile, 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            categories = line.split(", ")
-            tagDate = categories[0].split(" ")[0]
-            splitTagDate = tagDate.split("/")
-            tagDay = int(splitTagDate[1])
-            tagMonth = int(splitTagDate[0])
-            tagYear = int(splitTagDate[2])
-            if tagYear < year and categories[1].lower() == tag:
-                lines.remove(line)
-            elif tagYear == year and tagMonth < month and categories[1].lower() == tag:
-                lines.remove(line)
-            elif tagYear == year and tagMonth == month and tagDay <= day and categories[1].lower() == tag:
-                lines.remove(line)
+        for line in file.readlines():
+            fields = LogParser.parseLine(line)
+            if fields is not None and fields[1].lower() == tag and DateCodec.toOrdinal(fields[0]) <= cutoff:
+                continue
+            lines.append(line)
 
     # write lines back to file after removing data
+    logFile = perfPath + "\\" + os.path.basename(tagFile)
     try:
-        with open(tagFile, 'w') as file:
-            file.writelines(lines)
+        if args.cache != '':
+            LogSync.writeLog(logFile, tagFile, "".join(lines))
+        else:
+            with open(logFile, 'w') as file:
+                file.writelines(lines)
     except:
-        print("ERROR: Directory is read-only. Cannot overwrite {}".format(tagFile))
+        print("ERROR: Directory is read-only. Cannot overwrite {}".format(logFile))
+    if args.logs != '':
+        IngestionCursor.markRewritten(args.logs, tagFile.split("\\")[-1])
 
     # remove csv file from directory
-    csv = tagFile.split(".log")[0] + "_performance.csv"
+    csv = logFile.split(".log")[0] + "_performance.csv"
     if os.path.exists(csv):
         try:
             os.remove(csv)
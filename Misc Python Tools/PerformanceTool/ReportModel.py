@@ -0,0 +1,96 @@
+import DateCodec
+import TimeSketch
+
+# number of scenarios shown on each page of the report
+panelsPerPage = 3
+
+# returns the data shown for one flagged scenario in the report
+# dailyTimes is a dictionary of date to the time for that day, bugs are the lines of Bugs.txt for the test, None if the lookup failed
+# findings are the regressions RegressionDetectors reported for the scenario, versionShift is from VersionIndex.firstShift
+# dailySketches is a dictionary of date to a sketch of that day's times, used for the min, median, p90 and max of each day
+def buildPanel(testName, scenario, dailyTimes, latestRun, lastDate, baseline, historicalBaseline, average, bugs, findings=(), versionShift=None, dailySketches=None):
+    panel = {
+        "testName": testName,
+        "scenario": scenario,
+        "dates": [],
+        "times": [],
+        "latest": latestRun,
+        "baseline": baseline,
+        "historicalBaseline": historicalBaseline,
+        "average": average,
+        "bugs": bugs[1:] if bugs is not None else None,
+        "recommendations": [],
+        "findings": list(findings),
+        "versionShift": versionShift,
+        "bands": {"min": [], "median": [], "p90": [], "max": []}
+        }
+
+    # format performance data for plot
+    for date in sorted(dailyTimes, key=DateCodec.toOrdinal):
+        dateData = date.split("/")
+        panel["dates"].append(dateData[0] + "/" + dateData[1])
+        panel["times"].append(dailyTimes[date])
+        if dailySketches is not None:
+            for band, q in [["min", 0], ["median", 0.5], ["p90", 0.9], ["max", 1]]:
+                panel["bands"][band].append(TimeSketch.quantile(dailySketches[date], q))
+
+    # calculate change from average and change from baselines
+    panel["changeFromHistoricalBaseline"] = (latestRun - historicalBaseline) / historicalBaseline * 100
+    panel["changeFromBaseline"] = (latestRun - baseline) / baseline * 100
+    if average != 0:
+        panel["averageChange"] = (latestRun - average) / average * 100
+    else:
+        panel["averageChange"] = 0
+
+    # Add suggestion if always above baseline
+    allFailed = True
+    for t in panel["times"]:
+        if t <= baseline:
+            allFailed = False
+    if allFailed:
+        reccommendedBase = max(panel["times"]) * 1.1
+        panel["recommendations"].append("Update baseline to " + "{:.3f}".format(reccommendedBase) + ",\nor investigate performance.")
+
+    # Add suggestion if newest data is more than two weeks old
+    if lastDate < DateCodec.windowStart(14):
+        panel["recommendations"].append("Most recent data is old.\nCheck if the scenario has changed or has run.")
+
+    return panel
+
+# returns the lines of results printed next to a scenario's graph
+def resultText(panel):
+    testText =  "\nLatest: " + "{:.3f}".format(panel["latest"])
+    testText += "\nHistorical Baseline: "+ "{:.3f}".format(panel["historicalBaseline"]) + "\nChange from Historical Baseline: " + "{:.1f}".format(panel["changeFromHistoricalBaseline"]) + "%"
+    testText += "\nTest Baseline: "+ "{:.3f}".format(panel["baseline"]) + "\nChange from Test Baseline: " + "{:.1f}".format(panel["changeFromBaseline"]) + "%"
+    testText += "\nAverage: " + "{:.3f}".format(panel["average"]) + "\nChange from Average: " + "{:.1f}".format(panel["averageChange"]) + "%"
+    return testText
+
+# returns the regressions, first slower version, bugs and recommendations printed below a scenario's results
+# the regression found by the threshold detector is already shown by the results
+def noteText(panel):
+    testText = ''
+    for finding in panel["findings"]:
+        if finding["detector"] != "threshold":
+            testText += "\nRegression ({}): since {}, {:+.1f}%, confidence {:.2f}".format(finding["detector"], finding["start"], finding["magnitude"], finding["confidence"])
+    shift = panel["versionShift"]
+    if shift is not None:
+        testText += "\nFirst slower version: {} (after {}), median {:.3f}, p90 {:.3f}, {:+.1f}%".format(shift["version"], shift["previous"], shift["median"], shift["p90"], shift["change"])
+    if panel["bugs"] is None:
+        testText += "\nAssociated Bugs: lookup failed\n"
+    else:
+        if len(panel["bugs"]) >= 1:
+            testText += "\nAssociated Bugs:\n"
+        for line in panel["bugs"]:
+            testText += line
+    for recommendation in panel["recommendations"]:
+        testText += "\nRecommendation: " + recommendation + "\n"
+    return testText
+
+# splits panels into pages, a report with no panels still has a first page
+def paginate(panels):
+    pages = []
+    for index in range(0, len(panels), panelsPerPage):
+        pages.append(panels[index:index + panelsPerPage])
+    if len(pages) == 0:
+        pages.append([])
+    return pages
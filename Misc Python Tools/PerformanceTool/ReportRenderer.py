@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import matplotlib.pyplot as plt
+import matplotlib.font_manager as font_manager
+import matplotlib.backends.backend_pdf
+from matplotlib import ticker
+import ReportModel
+
+# pypdf is only needed to join pages rendered in separate processes or from cached panels without turning them into images
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+rows = ReportModel.panelsPerPage
+columns = 2
+
+# returns a new page of the report and the axes for each row of graphs and text
+# the first page has a title with the machines and date of the report, and the machine speed factors if times were normalized
+# the title and footer are left out if frame is not set, and only rows in panelRows get axes, the others are None
+def newPage(first, header, frame=True, panelRows=range(rows)):
+    plt.rc('xtick', labelsize=8)
+    plt.rc('ytick', labelsize=8)
+    fig = plt.figure(figsize=(11, 8.5), constrained_layout=False)
+    if first:
+        # formatting for first page of report
+        gs = fig.add_gridspec(nrows=rows+2, ncols=columns+2, height_ratios=[3.5, 10, 10, 10, 0.5], width_ratios=[1, 20, 20, 1],
+            left=0.0, bottom=0.0, right=1.0, top=1.0, wspace=0.10, hspace=0.4)
+        if frame:
+            title = fig.add_subplot(gs[0, :])
+            title.get_xaxis().set_visible(False)
+            title.get_yaxis().set_visible(False)
+            title.set_facecolor('#012456')
+            title.text(0.008, 0.90, "Performance Report", horizontalalignment="left", verticalalignment="top", color="white", font="Arial", fontsize=20, wrap=True)
+            title.text(0.01, 0.475, "Machine: " + ",".join(header["machines"]) + "\nDate: " + header["date"],
+                horizontalalignment="left", verticalalignment="top", color="white", font="Arial", fontsize=10, wrap=True)
+            if "factors" in header:
+                title.text(0.99, 0.475, header["factors"], horizontalalignment="right", verticalalignment="top", color="white", font="Arial", fontsize=10, wrap=True)
+    else:
+        # formatting for report pages after first page
+        gs = fig.add_gridspec(nrows=rows+2, ncols=columns+2, height_ratios=[0.5, 10, 10, 10, 0.45], width_ratios=[1, 20, 20, 1],
+            left=0.0, bottom=0.0, right=1.0, top=1.0, wspace=0.10, hspace=0.4)
+    if frame:
+        footer = fig.add_subplot(gs[-1, :])
+        footer.get_xaxis().set_visible(False)
+        footer.get_yaxis().set_visible(False)
+        footer.set_facecolor('#012456')
+
+    # creating subplots for page
+    axes = [None] * rows
+    for row in panelRows:
+        axes[row] = [fig.add_subplot(gs[row + 1, 1]), fig.add_subplot(gs[row + 1, 2])]
+
+    # hide axes in subplots that will be used for text entry
+    for row in panelRows:
+        axes[row][1].axis("off")
+    return fig, axes
+
+# draws the graph and text of one scenario in a row of a page
+def drawPanel(axesRow, panel):
+    #create graph
+    historicalBaseline_line = axesRow[0].axhline(y=panel["historicalBaseline"], linewidth=1.3, color="#8d2424")
+    baseline_line = axesRow[0].axhline(y=panel["baseline"], linewidth=1.3, color="#005C00")
+    axesRow[0].plot(panel["dates"], panel["times"], color="#012456", linewidth=1.0, marker="o", markersize=3)
+
+    #shade the range of each day's times and the band from its median to p90 when a scenario ran more than once a day
+    bands = panel["bands"]
+    if len(bands["max"]) > 0 and bands["max"] != bands["min"]:
+        axesRow[0].fill_between(panel["dates"], bands["min"], bands["max"], color="#012456", alpha=0.12, linewidth=0)
+        axesRow[0].fill_between(panel["dates"], bands["median"], bands["p90"], color="#012456", alpha=0.3, linewidth=0)
+    axesRow[0].legend([historicalBaseline_line, baseline_line], ["Historical Baseline", "Test Baseline"],
+        loc="upper left", ncol=2, fancybox=False, edgecolor="white", borderaxespad=0.15, framealpha=1, prop=font_manager.FontProperties(family="Arial", size=8))
+
+    #limit number of x-axis ticks to prevent tick labels from overlapping
+    maxNumTicks = 15
+    xticks = ticker.MaxNLocator(min(maxNumTicks, len(panel["dates"])))
+    axesRow[0].xaxis.set_major_locator(xticks)
+
+    #get test information to print
+    axesRow[1].text(0.0, 1.0, panel["testName"], verticalalignment="top", color="#012456", font="Arial", fontsize=12, weight="bold")
+    axesRow[1].text(0.0, 0.9, panel["scenario"], verticalalignment="top", color="#012456", font="Arial", fontsize=10)
+    axesRow[1].text(0.0, 0.835, ReportModel.resultText(panel), verticalalignment="top", color="black", font="Arial", fontsize=10)
+
+    # Print any bugs and recommendations for the scenario
+    axesRow[1].text(0.0, 0.225, ReportModel.noteText(panel), verticalalignment="top", color = '#8d2424', font="Arial", fontsize=10, wrap=True)
+
+# returns the figure for one page of the report
+def drawPage(pageNumber, panels, header):
+    fig, axes = newPage(pageNumber == 0, header)
+    for plotNum, panel in enumerate(panels):
+        drawPanel(axes[plotNum], panel)
+
+    #hide any empty plots at the end of the report
+    for index in range(len(panels), rows):
+        axes[index][0].axis("off")
+
+    # add message if there are no failing scenarios
+    if len(panels) == 0:
+        drawEmptyMessage(axes, header)
+    return fig
+
+# writes the message shown on a report without flagged scenarios in the first row of a page
+def drawEmptyMessage(axes, header):
+    axes[0][1].text(0.0, 1.0, "No performance scenarios flagged on {}.\nSee Power BI for detailed performance results.".format(header["date"]),
+        verticalalignment="top", color="black", font="Arial", fontsize=12)
+
+# creates pdf with graphs, one page at a time
+def renderPdf(pages, header, savePath):
+    pdf = matplotlib.backends.backend_pdf.PdfPages(savePath)
+    for pageNumber, panels in enumerate(pages):
+        fig = drawPage(pageNumber, panels, header)
+        pdf.savefig(fig)
+        plt.close(fig)
+    pdf.close()
+
+# draws one page in a worker process and saves it as a single page pdf, or as a png if pages will be joined as images
+def renderPageFile(pageNumber, panels, header, outputPath, dpi):
+    matplotlib.use("Agg")
+    fig = drawPage(pageNumber, panels, header)
+    fig.savefig(outputPath, dpi=dpi)
+    plt.close(fig)
+    return outputPath
+
+# creates pdf with graphs by drawing pages in up to workers processes and joining them in page order
+# pages are joined with pypdf when it is installed, otherwise each page is added as an image with the given dpi
+def renderPdfParallel(pages, header, savePath, workers, dpi=150):
+    extension = ".pdf" if pypdf is not None else ".png"
+    with tempfile.TemporaryDirectory() as pagePath:
+        outputPaths = [os.path.join(pagePath, str(pageNumber) + extension) for pageNumber in range(len(pages))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputPaths = list(pool.map(renderPageFile, range(len(pages)), pages, [header] * len(pages), outputPaths, [dpi] * len(pages)))
+
+        if pypdf is not None:
+            writer = pypdf.PdfWriter()
+            for outputPath in outputPaths:
+                writer.append(outputPath)
+            with open(savePath, 'wb') as f:
+                writer.write(f)
+            return
+
+        pdf = matplotlib.backends.backend_pdf.PdfPages(savePath)
+        for outputPath in outputPaths:
+            fig = plt.figure(figsize=(11, 8.5), dpi=dpi)
+            fig.figimage(plt.imread(outputPath))
+            pdf.savefig(fig, dpi=dpi)
+            plt.close(fig)
+        pdf.close()
+
+# returns a hash of the code that draws panels, so cached panels are drawn again when it changes
+def codeHash():
+    digest = hashlib.sha256()
+    for module in [__file__, ReportModel.__file__]:
+        with open(module, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+# returns the name a panel is cached under, a hash of everything drawn for it, the row and page layout it is drawn in,
+# and the code that draws it
+def panelKey(panel, first, row, code):
+    digest = hashlib.sha256(code.encode())
+    digest.update(json.dumps([panel, first, row], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+# matches the names of panels and half written panels in the cache, so other files kept in the same directory are never removed
+panelName = re.compile(r"[0-9a-f]{64}\.pdf(\.tmp)?")
+
+# draws one panel alone in its place on a page and saves it as a single page pdf with a transparent background
+def renderPanelFile(first, row, panel, outputPath):
+    matplotlib.use("Agg")
+    fig, axes = newPage(first, None, frame=False, panelRows=[row])
+    drawPanel(axes[row], panel)
+    fig.savefig(outputPath, format="pdf", transparent=True)
+    plt.close(fig)
+    return outputPath
+
+# draws the title and footer of a page without any panels, with the message for a report without flagged scenarios if empty is set
+def renderFrameFile(first, header, empty, outputPath):
+    fig, axes = newPage(first, header, panelRows=[0] if empty else [])
+    if empty:
+        axes[0][0].axis("off")
+        drawEmptyMessage(axes, header)
+    fig.savefig(outputPath)
+    plt.close(fig)
+    return outputPath
+
+# creates pdf with graphs, reusing panels drawn by earlier reports from cachePath and only drawing new or changed panels,
+# in up to workers processes, then laying each page's panels over its title and footer
+# panels in the cache that are not in this report are removed, other files in it are left alone, and without pypdf every page is drawn again
+# returns the number of panels drawn and the number reused
+def renderPdfCached(pages, header, savePath, cachePath, workers=1):
+    if pypdf is None:
+        if workers > 1:
+            renderPdfParallel(pages, header, savePath, workers)
+        else:
+            renderPdf(pages, header, savePath)
+        return sum(len(panels) for panels in pages), 0
+
+    os.makedirs(cachePath, exist_ok=True)
+    code = codeHash()
+    pagePaths = []
+    missing = {}
+    for pageNumber, panels in enumerate(pages):
+        pagePaths.append([])
+        for row, panel in enumerate(panels):
+            panelPath = os.path.join(cachePath, panelKey(panel, pageNumber == 0, row, code) + ".pdf")
+            if not os.path.exists(panelPath) and panelPath not in missing:
+                missing[panelPath] = [pageNumber == 0, row, panel]
+            pagePaths[-1].append(panelPath)
+
+    # panels are drawn to a temporary name first so an interrupted report cannot leave half written panels in the cache
+    jobs = [missing[panelPath] + [panelPath + ".tmp"] for panelPath in missing]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(renderPanelFile, *zip(*jobs)))
+    else:
+        for job in jobs:
+            renderPanelFile(*job)
+    for panelPath in missing:
+        os.replace(panelPath + ".tmp", panelPath)
+
+    writer = pypdf.PdfWriter()
+    with tempfile.TemporaryDirectory() as framePath:
+        frames = {}
+        for pageNumber, panelPaths in enumerate(pagePaths):
+            layout = (pageNumber == 0, len(panelPaths) == 0)
+            if layout not in frames:
+                frames[layout] = renderFrameFile(layout[0], header, layout[1], os.path.join(framePath, str(len(frames)) + ".pdf"))
+            page = pypdf.PdfReader(frames[layout]).pages[0]
+            for panelPath in panelPaths:
+                page.merge_page(pypdf.PdfReader(panelPath).pages[0])
+            writer.add_page(page)
+
+        # merged pages hold a copy of the fonts of every panel, so identical objects are shared to keep the file small
+        for page in writer.pages:
+            page.compress_content_streams()
+        writer.compress_identical_objects()
+        with open(savePath, 'wb') as f:
+            writer.write(f)
+
+    used = set(os.path.basename(panelPath) for panelPaths in pagePaths for panelPath in panelPaths)
+    for name in os.listdir(cachePath):
+        if panelName.fullmatch(name) and name not in used:
+            os.remove(os.path.join(cachePath, name))
+    return len(missing), len(used) - len(missing)
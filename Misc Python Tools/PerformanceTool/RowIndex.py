@@ -0,0 +1,32 @@
+import hashlib
+import os
+import SafeFile
+
+# returns hash of a row of a _performance.csv file, given as text or encoded as utf-8
+def rowKey(line):
+    if isinstance(line, str):
+        line = line.encode()
+    return hashlib.blake2b(line, digest_size=16).hexdigest()
+
+# returns the path of the index saved next to a _performance.csv file
+def indexPath(csvPath):
+    return os.path.splitext(csvPath)[0] + ".idx"
+
+# returns set of hashes of every row in a _performance.csv file
+# the saved index is only used if the csv has not been changed since the index was saved, otherwise it is rebuilt from the csv
+def loadIndex(csvPath):
+    stat = os.stat(csvPath)
+    if os.path.exists(indexPath(csvPath)):
+        with open(indexPath(csvPath), 'r') as f:
+            if f.readline().split() == [str(stat.st_size), str(stat.st_mtime_ns)]:
+                return set(f.read().split())
+    with open(csvPath, 'r') as f:
+        return set(rowKey(line) for line in f)
+
+# saves set of row hashes along with the size and modified time of the csv it was built from
+def saveIndex(csvPath, index):
+    stat = os.stat(csvPath)
+    with SafeFile.replacing(indexPath(csvPath)) as f:
+        f.write(str(stat.st_size) + " " + str(stat.st_mtime_ns) + "\n")
+        for key in index:
+            f.write(key + "\n")
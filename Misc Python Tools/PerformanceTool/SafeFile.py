@@ -0,0 +1,23 @@
+import contextlib
+import json
+import os
+
+# returns size and modified time of a file, None if it does not exist
+def fileStat(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# opens a temporary file next to path for writing and moves it over path once it is written,
+# so an interrupted run cannot leave a half written file
+@contextlib.contextmanager
+def replacing(path, mode='w'):
+    with open(path + ".tmp", mode) as f:
+        yield f
+    os.replace(path + ".tmp", path)
+
+# saves data as json in place of path
+def saveJson(path, data, indent=None):
+    with replacing(path) as f:
+        json.dump(data, f, indent=indent)
@@ -0,0 +1,84 @@
+import math
+import numpy
+
+# each bin holds times up to binGrowth times larger than the bin below it, so quantiles are within half a percent
+binGrowth = 1.01
+
+# times at or below this many seconds are all kept in the lowest bin
+minimumTime = 0.001
+
+# returns an empty sketch, which keeps the number of times, the lowest and highest time and a count of times in each bin
+# bins are keyed by text so sketches can be saved as JSON
+def newSketch():
+    return {"n": 0, "min": None, "max": None, "bins": {}}
+
+# returns the bin that holds a time
+def binOf(time):
+    return str(math.floor(math.log(max(time, minimumTime)) / math.log(binGrowth)))
+
+# returns the time in the middle of a bin
+def binTime(key):
+    return binGrowth ** (int(key) + 0.5)
+
+# adds a time to a sketch
+def add(sketch, time):
+    key = binOf(time)
+    sketch["bins"][key] = sketch["bins"].get(key, 0) + 1
+    sketch["n"] += 1
+    if sketch["min"] is None or time < sketch["min"]:
+        sketch["min"] = time
+    if sketch["max"] is None or time > sketch["max"]:
+        sketch["max"] = time
+
+# adds an array of times to a sketch
+def addMany(sketch, times):
+    if len(times) == 0:
+        return
+    keys, counts = numpy.unique(numpy.floor(numpy.log(numpy.maximum(times, minimumTime)) / math.log(binGrowth)).astype(numpy.int64), return_counts=True)
+    for key, count in zip(keys.tolist(), counts.tolist()):
+        sketch["bins"][str(key)] = sketch["bins"].get(str(key), 0) + count
+    sketch["n"] += len(times)
+    lowest = float(times.min())
+    highest = float(times.max())
+    sketch["min"] = lowest if sketch["min"] is None else min(sketch["min"], lowest)
+    sketch["max"] = highest if sketch["max"] is None else max(sketch["max"], highest)
+
+# adds the times of source to target
+def merge(target, source, factor=1.0):
+    if factor != 1.0:
+        source = scaled(source, factor)
+    for key, count in source["bins"].items():
+        target["bins"][key] = target["bins"].get(key, 0) + count
+    target["n"] += source["n"]
+    for name, pick in [["min", min], ["max", max]]:
+        if source[name] is not None:
+            target[name] = source[name] if target[name] is None else pick(target[name], source[name])
+
+# returns a copy of a sketch with every time divided by factor, moving each count to the nearest bin
+def scaled(sketch, factor):
+    shift = round(math.log(factor) / math.log(binGrowth))
+    copy = newSketch()
+    copy["n"] = sketch["n"]
+    if sketch["n"] > 0:
+        copy["min"] = sketch["min"] / factor
+        copy["max"] = sketch["max"] / factor
+    for key, count in sketch["bins"].items():
+        copy["bins"][str(int(key) - shift)] = count
+    return copy
+
+# returns the time at quantile q from 0 to 1 using the nearest rank, None for an empty sketch
+# the lowest and highest quantiles are the exact lowest and highest times
+def quantile(sketch, q):
+    if sketch["n"] == 0:
+        return None
+    if q <= 0:
+        return sketch["min"]
+    if q >= 1:
+        return sketch["max"]
+    rank = max(math.ceil(q * sketch["n"]), 1)
+    seen = 0
+    for key in sorted(sketch["bins"], key=int):
+        seen += sketch["bins"][key]
+        if seen >= rank:
+            return min(max(binTime(key), sketch["min"]), sketch["max"])
+    return sketch["max"]
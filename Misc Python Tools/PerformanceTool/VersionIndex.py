@@ -0,0 +1,107 @@
+import json
+import os
+import numpy
+import DateCodec
+import SafeFile
+import TimeSketch
+
+# name of the file that stores the times of each scenario on each version, saved next to the _performance.csv files
+indexFileName = "Version Index.json"
+
+# fewest times a version needs before it is compared with the versions before it
+minimumCount = 3
+
+# smallest increase in percent of a version's median over the median of the versions before it that counts as a shift
+minimumChange = 5
+
+# loads the index, which holds a sketch of the times of each scenario of each test on each machine and version
+# index["tests"][test] is {"stat": size and modified time of the _performance.csv the test was last synced with,
+# "scenarios": {scenario: {machine: {version: {"first": ordinal of the first date of the version, "sketch": sketch}}}}}
+def loadIndex(path):
+    indexPath = os.path.join(path, indexFileName)
+    if not os.path.exists(indexPath):
+        return {"tests": {}}
+    with open(indexPath, 'r') as f:
+        return json.load(f)
+
+# saves the index for the next run
+def saveIndex(path, index):
+    SafeFile.saveJson(os.path.join(path, indexFileName), index)
+
+# adds rows of a _performance.csv file to the scenarios of a test
+# rows are grouped by scenario, machine and version first so the times of each group are added to its sketch at once
+# scenarios can contain commas but the other columns cannot, so rows are split from the end
+def addRows(scenarios, lines):
+    groups = {}
+    for line in lines:
+        scenario, test, time, date, machine, version = line.rstrip("\n").rsplit(",", 5)
+        if (scenario, machine, version) not in groups:
+            groups[(scenario, machine, version)] = [[], set()]
+        groups[(scenario, machine, version)][0].append(time)
+        groups[(scenario, machine, version)][1].add(date)
+
+    for (scenario, machine, version), (times, dates) in groups.items():
+        if scenario not in scenarios:
+            scenarios[scenario] = {}
+        if machine not in scenarios[scenario]:
+            scenarios[scenario][machine] = {}
+        first = min(DateCodec.toOrdinal(date) for date in dates)
+        if version not in scenarios[scenario][machine]:
+            scenarios[scenario][machine][version] = {"first": first, "sketch": TimeSketch.newSketch()}
+        entry = scenarios[scenario][machine][version]
+        entry["first"] = min(entry["first"], first)
+        TimeSketch.addMany(entry["sketch"], numpy.array(times, dtype=numpy.float64))
+
+# returns the scenarios of a test, ready to have the rows that are about to be appended to its _performance.csv added
+# a test whose _performance.csv changed since it was last synced is rebuilt from the file
+def testScenarios(index, test, csvPath):
+    entry = index["tests"].get(test)
+    stat = SafeFile.fileStat(csvPath)
+    if entry is None or entry["stat"] != stat:
+        entry = {"stat": stat, "scenarios": {}}
+        index["tests"][test] = entry
+        if stat is not None:
+            with open(csvPath, 'r') as f:
+                f.readline()
+                addRows(entry["scenarios"], f)
+    return entry["scenarios"]
+
+# records that the rows appended to a test's _performance.csv have been added
+def synced(index, test, csvPath):
+    index["tests"][test]["stat"] = SafeFile.fileStat(csvPath)
+
+# returns (version, sketch) of each version of a scenario, ordered by the first date each version was seen
+# sketches of the specified machines are combined, with times divided by the machine's factor if factors are given
+def versionSketches(index, test, scenario, machines, factors=None):
+    machineVersions = index["tests"].get(test, {"scenarios": {}})["scenarios"].get(scenario, {})
+    versions = {}
+    for machine in machines:
+        for version, entry in machineVersions.get(machine, {}).items():
+            if version not in versions:
+                versions[version] = {"first": entry["first"], "sketch": TimeSketch.newSketch()}
+            versions[version]["first"] = min(versions[version]["first"], entry["first"])
+            TimeSketch.merge(versions[version]["sketch"], entry["sketch"], factors[machine][0] if factors is not None else 1.0)
+    return [(version, versions[version]["sketch"]) for version in sorted(versions, key=lambda version: (versions[version]["first"], version))]
+
+# returns (version, count, median, p90) of each version of a scenario, in the order of versionSketches
+def versionStats(index, test, scenario, machines, factors=None):
+    return [(version, sketch["n"], TimeSketch.quantile(sketch, 0.5), TimeSketch.quantile(sketch, 0.9))
+        for version, sketch in versionSketches(index, test, scenario, machines, factors)]
+
+# returns the first version whose median is at least minimumChange percent above the median of all versions before it
+# and stays that far above it in every later version, or None if the scenario did not shift
+# only versions with at least minimumCount times are compared, the result is a dictionary of the version, the version
+# before it, the count, median and p90 of the version and the increase of its median in percent
+def firstShift(index, test, scenario, machines, factors=None):
+    sketches = [(version, sketch) for version, sketch in versionSketches(index, test, scenario, machines, factors) if sketch["n"] >= minimumCount]
+    before = TimeSketch.newSketch()
+    for position, (version, sketch) in enumerate(sketches):
+        if position > 0:
+            beforeMedian = TimeSketch.quantile(before, 0.5)
+            limit = beforeMedian * (1 + minimumChange / 100)
+            if all(TimeSketch.quantile(later, 0.5) >= limit for laterVersion, later in sketches[position:]):
+                median = TimeSketch.quantile(sketch, 0.5)
+                return {"version": version, "previous": sketches[position - 1][0], "count": sketch["n"], "median": median,
+                    "p90": TimeSketch.quantile(sketch, 0.9), "change": (median - beforeMedian) / beforeMedian * 100}
+        TimeSketch.merge(before, sketch)
+    return None